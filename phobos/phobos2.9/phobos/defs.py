@@ -72,6 +72,16 @@ jointtypes = (
 
 geometrytypes = (('box',) * 3, ('cylinder',) * 3, ('sphere',) * 3, ('mesh',) * 3)
 
+inertiaapproximations = (
+    ('mesh', 'Mesh', 'Exact inertia of the closed mesh'),
+    ('hull', 'Convex hull', 'Exact inertia of the convex hull of the mesh'),
+    ('voxel', 'Voxels', 'Inertia of the voxelized mesh'),
+    ('box', 'Box', 'Inertia of the bounding box of the mesh'),
+    ('cylinder', 'Cylinder', 'Inertia of a cylinder fitted to the bounding box of the mesh'),
+    ('sphere', 'Sphere', 'Inertia of a sphere fitted to the bounding box of the mesh'),
+    ('ellipsoid', 'Ellipsoid', 'Inertia of an ellipsoid fitted to the bounding box of the mesh'),
+)
+
 linkobjignoretypes = {'link', 'joint', 'submechanism', 'entity', 'model'}
 controllabletypes = ['motor']
 
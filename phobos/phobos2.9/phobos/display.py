@@ -40,13 +40,19 @@ colors = {
     'blue': (0.0, 0.0, 0.1, 1.0),
     'transparent': (1.0, 1.0, 1.0, 0.0),
 }
-messages = collections.deque([], 50)
+#: Maximum number of messages kept in the message history.
+MESSAGE_HISTORY = 50
+messages = collections.deque([], MESSAGE_HISTORY)
+#: Number of messages pushed so far, used to detect changes of the message history.
+messagecount = 0
+#: Cached overlay layout of the message history, see :func:`get_message_layout`.
+messagelayout = {'key': None, 'boxes': []}
 slotheight = 22
-slotlower = [4 + slotheight * slot for slot in range(50)]
+slotlower = [4 + slotheight * slot for slot in range(MESSAGE_HISTORY)]
 
 
 def push_message(text, msgtype='none'):
-    """
+    """Adds a message to the message history, dropping the oldest one if it is full.
 
     Args:
       text: 
@@ -55,7 +61,9 @@ def push_message(text, msgtype='none'):
     Returns:
 
     """
+    global messagecount
     messages.appendleft({'text': text, 'type': msgtype})
+    messagecount += 1
 
 
 def getRegionData():
@@ -207,9 +215,26 @@ def draw_message(text, msgtype, slot, opacity=1.0, offset=0):
 
     Returns:
 
+    """
+    draw_message_box(layout_message(text, msgtype, slot, bpy.context.region.width, opacity, offset))
+
+
+def layout_message(text, msgtype, slot, width, opacity=1.0, offset=0):
+    """Computes the geometry of a message box in the message overlay.
+
+    Args:
+      text: 
+      msgtype: 
+      slot: 
+      width: width of the region to draw in
+      opacity: (Default value = 1.0)
+      offset: (Default value = 0)
+
+    Returns:
+      : dict -- message box as drawn by :func:`draw_message_box`
+
     """
     blf.size(0, 6, 150)
-    width = bpy.context.region.width
     start = width - blf.dimensions(0, text)[0] - 6
     points = (
         (start, slotlower[slot]),
@@ -217,11 +242,66 @@ def draw_message(text, msgtype, slot, opacity=1.0, offset=0):
         (width - 2, slotlower[slot] + slotheight - 4),
         (start, slotlower[slot] + slotheight - 4),
     )
-    draw_2dpolygon(points, fillcolor=(*colors[msgtype], 0.2 * opacity))
-    draw_text(text, (start + 2, slotlower[slot] + 4), size=6, color=(1, 1, 1, opacity))
-    if slot == 0 and offset > 0:
+    return {
+        'text': text,
+        'points': points,
+        'fillcolor': (*colors[msgtype], 0.2 * opacity),
+        'position': (start + 2, slotlower[slot] + 4),
+        'color': (1, 1, 1, opacity),
         # draw_text(str(offset) + ' \u25bc', (start - 30, slotlower[0] + 4), size=6, color=(1, 1, 1, opacity))
-        draw_text('+' + str(offset), (start - 30, slotlower[0] + 4), size=6, color=(1, 1, 1, 1))
+        'offset': ('+' + str(offset), (start - 30, slotlower[0] + 4))
+        if slot == 0 and offset > 0
+        else None,
+    }
+
+
+def draw_message_box(box):
+    """Draws a message box as computed by :func:`layout_message`.
+
+    Args:
+      box(dict): the message box
+
+    Returns:
+
+    """
+    draw_2dpolygon(box['points'], fillcolor=box['fillcolor'])
+    draw_text(box['text'], box['position'], size=6, color=box['color'])
+    if box['offset']:
+        draw_text(box['offset'][0], box['offset'][1], size=6, color=(1, 1, 1, 1))
+
+
+def get_message_layout(count, offset, width):
+    """Returns the message boxes of the message overlay.
+    
+    The layout is cached and only rebuilt if a message was pushed or the overlay settings or the
+    region width changed, so redrawing the overlay does not measure any text.
+
+    Args:
+      count(int): number of messages to show
+      offset(int): index of the first message to show
+      width(int): width of the region to draw in
+
+    Returns:
+      : list -- message boxes as drawn by :func:`draw_message_box`
+
+    """
+    key = (messagecount, count, offset, width)
+    if messagelayout['key'] == key:
+        return messagelayout['boxes']
+
+    boxes = []
+    for m in range(min(count, len(messages) - offset)):
+        opacity = 1.0
+        if 1 >= m <= offset - 1 or m >= count - 2:
+            opacity = 0.5
+        if offset > 1 > m or m >= count - 1:
+            opacity = 0.1
+        msg = messages[m + offset]
+        boxes.append(layout_message(msg['text'], msg['type'], m, width, opacity, offset))
+
+    messagelayout['key'] = key
+    messagelayout['boxes'] = boxes
+    return boxes
 
 
 def draw_progressbar(value):
@@ -440,17 +520,10 @@ def draw_callback_2d(self, context):
 
     # log messages
     if wm.draw_messages:
-        for m in range(wm.phobos_msg_count):
-            opacity = 1.0
-            if 1 >= m <= wm.phobos_msg_offset - 1 or m >= wm.phobos_msg_count - 2:
-                opacity = 0.5
-            if wm.phobos_msg_offset > 1 > m or m >= wm.phobos_msg_count - 1:
-                opacity = 0.1
-            try:
-                msg = messages[m + wm.phobos_msg_offset]
-                draw_message(msg['text'], msg['type'], m, opacity, offset=wm.phobos_msg_offset)
-            except IndexError:
-                pass
+        for box in get_message_layout(
+            wm.phobos_msg_count, wm.phobos_msg_offset, context.region.width
+        ):
+            draw_message_box(box)
 
     # restore opengl defaults
     bgl.glLineWidth(1)
@@ -108,7 +108,7 @@ def createController(controller, reference, origin=mathutils.Matrix(), annotatio
             phobostype='controller',
         )
 
-    newcontroller.name = controller['name']
+    nUtils.safelyName(newcontroller, controller['name'])
     newcontroller['controller/type'] = controller['type']
 
     # write the custom properties to the controller
@@ -134,5 +134,6 @@ def createController(controller, reference, origin=mathutils.Matrix(), annotatio
             bpy.ops.object.parent_set(type='BONE_RELATIVE')
         else:
             bpy.ops.object.parent_set(type='OBJECT')
+        sUtils.invalidateSceneIndex()
 
     return newcontroller
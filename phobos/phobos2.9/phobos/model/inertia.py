@@ -13,12 +13,17 @@
 Contains all functions to model inertias within Blender.
 """
 
+import os
 import math
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import numpy
 import bpy
 import mathutils
 import phobos.defs as defs
-from phobos.phoboslog import log
+from phobos.phoboslog import log, closeLogWriter
 import phobos.utils.general as gUtils
 import phobos.utils.selection as sUtils
 import phobos.utils.editing as eUtils
@@ -28,6 +33,21 @@ from phobos.model.geometries import deriveGeometry
 from phobos.model.poses import deriveObjectPose
 from phobos.utils.validation import validate
 
+#: Custom property of mesh datablocks which persists their mass properties in the .blend file.
+MASSPROPERTIES_KEY = 'phobos/massproperties'
+
+#: Unit density mass properties of meshes by the hash of their vertex and triangle buffers.
+massproperties = {}
+
+#: Minimum number of triangles for which :func:`computeMassPropertiesParallel` uses processes.
+PARALLEL_TRIANGLES = 100000
+
+#: Number of triangles integrated by one worker process at a time.
+CHUNK_TRIANGLES = 50000
+
+#: Packed vertex and triangle buffers of a parallel computation, shared with the forked workers.
+meshbuffers = None
+
 
 @validate('inertia_data')
 def createInertial(inertialdict, obj, size=0.03, errors=None, adjust=False, logging=False):
@@ -54,7 +74,7 @@ def createInertial(inertialdict, obj, size=0.03, errors=None, adjust=False, logg
         origin = mathutils.Vector()
 
     # create new inertial object
-    name = nUtils.getUniqueName('inertial_' + nUtils.getObjectName(obj), bpy.data.objects)
+    name = nUtils.getUniqueObjectName('inertial_' + nUtils.getObjectName(obj))
     inertialobject = bUtils.createPrimitive(
         name,
         'box',
@@ -85,9 +105,21 @@ def createInertial(inertialdict, obj, size=0.03, errors=None, adjust=False, logg
 
 
 @validate('geometry_type')
-def calculateInertia(obj, mass, geometry_dict=None, errors=None, adjust=False, logging=False):
+def calculateInertia(
+    obj,
+    mass,
+    geometry_dict=None,
+    errors=None,
+    adjust=False,
+    logging=False,
+    approximation='mesh',
+    resolution=32,
+):
     """Calculates the inertia of an object using the specified mass and
        optionally geometry.
+    
+    The inertia of mesh geometries is approximated as specified, see
+    :func:`approximateMeshInertia`. If logging, the relative error is estimated and logged.
 
     Args:
       obj(bpy.types.Object): object to calculate inertia from
@@ -100,6 +132,10 @@ def calculateInertia(obj, mass, geometry_dict=None, errors=None, adjust=False, l
       errors: (Default value = None)
       adjust: (Default value = False)
       logging: (Default value = False)
+      approximation(str, optional): approximation of mesh geometries, one of
+    :data:`phobos.defs.inertiaapproximations` (Default value = 'mesh')
+      resolution(int, optional): number of voxels along the largest dimension of voxelized
+    meshes (Default value = 32)
 
     Returns:
 
@@ -110,8 +146,7 @@ def calculateInertia(obj, mass, geometry_dict=None, errors=None, adjust=False, l
         return None
 
     inertia = None
-    if not geometry_dict:
-        geometry = deriveGeometry(obj)
+    geometry = geometry_dict if geometry_dict else deriveGeometry(obj)
 
     # Get the rotation of the object
     object_rotation = obj.rotation_euler.to_matrix()
@@ -123,15 +158,90 @@ def calculateInertia(obj, mass, geometry_dict=None, errors=None, adjust=False, l
     elif geometry['type'] == 'sphere':
         inertia = calculateSphereInertia(mass, geometry['radius'])
     elif geometry['type'] == 'mesh':
-        sUtils.selectObjects((obj,), clear=True, active=0)
-        inertia = calculateMeshInertia(mass, obj.data)
+        inertia, error = approximateMeshInertia(
+            mass, obj, approximation, resolution, estimate=logging
+        )
+        if logging:
+            message = "Approximated inertia of {} by {} with an estimated relative error of {:.1%}."
+            log(message.format(obj.name, approximation, error), 'INFO')
 
     # Correct the inertia orientation to account for Cylinder / mesh orientation issues
-    inertia = object_rotation * inertiaListToMatrix(inertia) * object_rotation.transposed()
+    inertia = object_rotation @ inertiaListToMatrix(inertia) @ object_rotation.transposed()
 
     return inertiaMatrixToList(inertia)
 
 
+def calculateInertias(
+    objects,
+    masses,
+    workers=None,
+    approximation='mesh',
+    resolution=32,
+    adjust=False,
+    logging=False,
+):
+    """Calculates the inertias of several objects at once.
+    
+    The mass properties of all meshes which are not cached yet are computed in parallel with
+    :func:`computeMassPropertiesParallel` first. The inertias are then calculated in one pass on
+    the main thread with :func:`calculateInertia`, which finds all meshes in the cache.
+
+    Args:
+      objects(list): bpy.types.Object to calculate the inertias from
+      masses(list): mass of each object
+      workers(int, optional): number of worker processes, if None the CPU count is used
+    (Default value = None)
+      approximation(str, optional): approximation of mesh geometries, see
+    :func:`calculateInertia` (Default value = 'mesh')
+      resolution(int, optional): number of voxels along the largest dimension of voxelized
+    meshes (Default value = 32)
+      adjust: (Default value = False)
+      logging: (Default value = False)
+
+    Returns:
+      : list -- tuple(6) of the upper diagonal of each inertia tensor
+
+    """
+    # only the exact approximation needs the mass properties of the meshes
+    meshes = set()
+    if approximation == 'mesh':
+        meshes = {
+            obj.data
+            for obj in objects
+            if obj.type == 'MESH' and obj.get('geometry/type') == 'mesh'
+        }
+
+    pending = {}
+    for data in meshes:
+        vertices, triangles, key = getMeshBuffers(data)
+        properties = lookupMassProperties(data, key)
+        if properties is None:
+            pending.setdefault(key, (vertices, triangles, []))[2].append(data)
+        else:
+            storeMassProperties(data, key, properties)
+
+    if pending:
+        log("Computing mass properties of {} meshes.".format(len(pending)), 'DEBUG')
+        results = computeMassPropertiesParallel(
+            [(vertices, triangles) for vertices, triangles, _ in pending.values()], workers
+        )
+        for (key, (_, _, datas)), properties in zip(pending.items(), results):
+            for data in datas:
+                storeMassProperties(data, key, properties)
+
+    return [
+        calculateInertia(
+            obj,
+            mass,
+            adjust=adjust,
+            logging=logging,
+            approximation=approximation,
+            resolution=resolution,
+        )
+        for obj, mass in zip(objects, masses)
+    ]
+
+
 def calculateBoxInertia(mass, size):
     """Returns upper diagonal of inertia tensor of a box as tuple.
 
@@ -217,259 +327,612 @@ def calculateEllipsoidInertia(mass, size):
     return ixx, ixy, ixz, iyy, iyz, izz
 
 
-def calculateMeshInertia(mass, data):
+def calculateMeshInertia(mass, data, scale=(1., 1., 1.)):
     """Calculates and returns the inertia tensor of arbitrary mesh objects.
     
+    The unit density mass properties of the mesh are looked up with
+    :func:`getMeshMassProperties`, so meshes shared by several objects are only integrated once.
+    The scale and mass are applied to these afterwards. The inertia is computed with respect to
+    the origin of the mesh.
+
+    Args:
+      data(bpy.types.BlendData): mesh data of the object
+      mass(float): mass of the object
+      scale(iterable, optional): scale of the object (Default value = (1., 1., 1.))
+
+    Returns:
+      6: inertia tensor
+
+    """
+    volume, com, secondmoment = scaleMassProperties(*getMeshMassProperties(data), scale)
+    inertia = massPropertiesToInertia(mass, volume, secondmoment)
+    return tuple(float(value) for value in inertia[numpy.triu_indices(3)])
+
+
+def getMeshMassProperties(data, buffers=None):
+    """Returns the unit density mass properties of a mesh.
+    
+    The mass properties are cached by a hash of the vertex and triangle buffers of the mesh, so
+    that they are computed only once for identical geometry. They are also stored as custom
+    property of the mesh datablock, thus reopening a .blend file does not compute them again.
+
+    Args:
+      data(bpy.types.Mesh): mesh data of the object
+      buffers(tuple, optional): buffers of the mesh as returned by :func:`getMeshBuffers`, if
+    None they are read from the mesh (Default value = None)
+
+    Returns:
+      : tuple -- volume, center of mass (numpy array 3) and 3x3 second moment of volume (numpy
+      array) relative to the origin
+
+    """
+    vertices, triangles, key = buffers if buffers else getMeshBuffers(data)
+    properties = lookupMassProperties(data, key)
+    if properties is None:
+        log("Computing mass properties of mesh " + data.name + ".", 'DEBUG')
+        properties = computeMeshMassProperties(vertices, triangles)
+    storeMassProperties(data, key, properties)
+    return properties
+
+
+def getMeshBuffers(data):
+    """Returns the vertex and triangle buffers of a mesh together with their hash.
+    
+    The mesh is split into triangles with Blender's loop triangles, so the mesh data is not
+    modified.
+
+    Args:
+      data(bpy.types.Mesh): mesh data of the object
+
+    Returns:
+      : tuple -- vertices (numpy array (n, 3)), triangles (numpy array (m, 3)) and hash (str)
+
+    """
+    data.calc_loop_triangles()
+    vertices = numpy.empty(len(data.vertices) * 3)
+    data.vertices.foreach_get('co', vertices)
+    triangles = numpy.empty(len(data.loop_triangles) * 3, dtype=numpy.int32)
+    data.loop_triangles.foreach_get('vertices', triangles)
+
+    digest = hashlib.sha1(vertices.tobytes())
+    digest.update(triangles.tobytes())
+    return vertices.reshape(-1, 3), triangles.reshape(-1, 3), digest.hexdigest()
+
+
+def lookupMassProperties(data, key):
+    """Returns the cached mass properties of a mesh, if there are any.
+
+    Args:
+      data(bpy.types.Mesh): mesh data of the object
+      key(str): hash of the mesh buffers as returned by :func:`getMeshBuffers`
+
+    Returns:
+      : tuple -- unit density mass properties or None
+
+    """
+    if key in massproperties:
+        return massproperties[key]
+
+    stored = data.get(MASSPROPERTIES_KEY)
+    if stored and stored.get('hash') == key:
+        massproperties[key] = (
+            stored['volume'],
+            numpy.array(list(stored['com'])),
+            numpy.array(list(stored['secondmoment'])).reshape(3, 3),
+        )
+        return massproperties[key]
+    return None
+
+
+def storeMassProperties(data, key, properties):
+    """Caches the mass properties of a mesh and stores them in its datablock.
+
+    Args:
+      data(bpy.types.Mesh): mesh data of the object
+      key(str): hash of the mesh buffers as returned by :func:`getMeshBuffers`
+      properties(tuple): unit density mass properties of the mesh
+
+    Returns:
+
+    """
+    massproperties[key] = properties
+
+    stored = data.get(MASSPROPERTIES_KEY)
+    # linked meshes can not be edited
+    if (stored and stored.get('hash') == key) or data.library is not None:
+        return
+    volume, com, secondmoment = properties
+    data[MASSPROPERTIES_KEY] = {
+        'hash': key,
+        'volume': float(volume),
+        'com': [float(value) for value in com],
+        'secondmoment': [float(value) for value in secondmoment.flat],
+    }
+
+
+def computeMeshInertia(mass, vertices, triangles):
+    """Computes volume, center of mass and inertia tensor of a closed triangle mesh.
+
+    Args:
+      mass(float): mass of the mesh, distributed with constant density
+      vertices(numpy.ndarray): array (n, 3) of vertex coordinates
+      triangles(numpy.ndarray): array (m, 3) of vertex indices of the triangles
+
+    Returns:
+      : tuple -- volume, center of mass (numpy array 3) and 3x3 inertia tensor (numpy array)
+      relative to the origin
+
+    """
+    volume, com, secondmoment = computeMeshMassProperties(vertices, triangles)
+    return volume, com, massPropertiesToInertia(mass, volume, secondmoment)
+
+
+def computeMeshMassProperties(vertices, triangles):
+    """Computes the unit density mass properties of a closed triangle mesh.
+
+    Args:
+      vertices(numpy.ndarray): array (n, 3) of vertex coordinates
+      triangles(numpy.ndarray): array (m, 3) of vertex indices of the triangles
+
+    Returns:
+      : tuple -- volume, center of mass (numpy array 3) and 3x3 second moment of volume (numpy
+      array) relative to the origin
+
+    """
+    volume, firstmoment, secondmoment = computeMeshMoments(vertices, triangles)
+    if volume == 0:
+        return 0., numpy.zeros(3), numpy.zeros((3, 3))
+    return volume, firstmoment / volume, secondmoment
+
+
+def computeMeshMoments(vertices, triangles):
+    """Integrates the volume and its first and second moment over a closed triangle mesh.
+    
     Implemented after the general idea of 'Finding the Inertia Tensor of a 3D Solid Body,
     Simply and Quickly' (2004) by Jonathan Blow (1) with formulas for tetrahedron inertia
     from 'Explicit Exact Formulas for the 3-D Tetrahedron Inertia Tensor in Terms of its
     Vertex Coordinates' (2004) by F. Tonon. (2)
     
+    Each triangle spans a tetrahedron with the origin. The signed volumes of these tetrahedra
+    add up to the volume of the mesh, if the triangles are consistently oriented (counter
+    clockwise seen from outside). All tetrahedra are integrated at once with numpy. As the
+    moments are sums over the triangles, the moments of parts of a mesh can be added up.
+    
     Links: (1) http://number-none.com/blow/inertia/body_i.html
            (2) http://docsdrive.com/pdfs/sciencepublications/jmssp/2005/8-11.pdf
 
     Args:
-      data(bpy.types.BlendData): mesh data of the object
-      mass(float): mass of the object
+      vertices(numpy.ndarray): array (n, 3) of vertex coordinates
+      triangles(numpy.ndarray): array (m, 3) of vertex indices of the triangles
 
     Returns:
-      6: inertia tensor
+      : tuple -- volume, first moment of volume (numpy array 3) and 3x3 second moment of volume
+      (numpy array) relative to the origin
 
     """
-    tetrahedra = []
-    mesh_volume = 0
-    origin = mathutils.Vector((0.0, 0.0, 0.0))
+    corners = numpy.asarray(vertices, dtype=float)[numpy.asarray(triangles)]
+
+    # six times the signed volume of each tetrahedron (det(J) with the origin as fourth vertex)
+    dets = numpy.einsum('ij,ij->i', corners[:, 0], numpy.cross(corners[:, 1], corners[:, 2]))
+
+    # the tetrahedron centroids are weighted by their volumes
+    sums = corners.sum(axis=1)
+    firstmoment = dets.dot(sums) / 24
+
+    # Tonon's integrals: 2 * sum(x_i * y_i) + sum(x_i * y_j, i != j) equals
+    # sum(x_i * y_i) + sum(x_i) * sum(y_i), which includes the squares for x = y
+    secondmoment = (
+        numpy.einsum(
+            'i,ijk->jk',
+            dets,
+            numpy.einsum('ilj,ilk->ijk', corners, corners) + sums[:, :, None] * sums[:, None, :],
+        )
+        / 120
+    )
+    return dets.sum() / 6, firstmoment, secondmoment
 
-    vertices = data.vertices
-    prev_mode = bpy.context.mode
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.quads_convert_to_tris(quad_method='FIXED')
-    bpy.ops.object.mode_set(mode=prev_mode)
-    polygons = data.polygons
 
-    for triangle in polygons:
-        verts = [vertices[index].co for index in triangle.vertices]
+def computeBufferedMoments(start, stop):
+    """Integrates the moments of a range of triangles of the shared :data:`meshbuffers`.
+    
+    This is run by the worker processes of :func:`computeMassPropertiesParallel`.
 
-        tri_normal = triangle.normal
-        tri_centre = triangle.center
-        ref_tri_vector = tri_centre - origin
-        # angle returns the angle in radians
-        normal_angle = ref_tri_vector.angle(tri_normal, math.pi / 2.0)
+    Args:
+      start(int): index of the first triangle
+      stop(int): index after the last triangle
 
-        sign = -1 if normal_angle > math.pi / 2.0 else 1
+    Returns:
+      : tuple -- moments as returned by :func:`computeMeshMoments`
 
-        J = mathutils.Matrix(
-            (
-                (verts[0][0], verts[0][1], verts[0][2], 1),
-                (verts[1][0], verts[1][1], verts[1][2], 1),
-                (verts[2][0], verts[2][1], verts[2][2], 1),
-                (origin[0], origin[1], origin[2], 1),
-            )
-        )
+    """
+    vertices, triangles = meshbuffers
+    return computeMeshMoments(vertices, triangles[start:stop])
 
-        abs_det_J = J.determinant()
 
-        volume = sign * abs_det_J / 6
+def computeMassPropertiesParallel(meshes, workers=None):
+    """Computes the unit density mass properties of several meshes with a process pool.
+    
+    All meshes are packed into one vertex and one triangle buffer, which are split into chunks
+    of :data:`CHUNK_TRIANGLES` triangles. The worker processes are forked, so that they share
+    the buffers with Blender and only the triangle ranges and the resulting moments are sent
+    between the processes. Large meshes are thus split up over several cores as well.
+    
+    Forking is required, as spawned workers could not import Blender. A fork only copies the
+    calling thread, so locks held by other threads stay locked in the workers forever. The
+    workers therefore only integrate the buffers and never call into Blender, and the log file
+    writer thread is stopped before forking, see :func:`phobos.phoboslog.closeLogWriter`. It is
+    started again by the next log record.
+    
+    Without fork, for a single worker or less than :data:`PARALLEL_TRIANGLES` triangles the
+    meshes are computed serially.
 
-        com = mathutils.Vector(
-            (
-                (verts[0][0] + verts[1][0] + verts[2][0] + origin[0]) / 4,
-                (verts[0][1] + verts[1][1] + verts[2][1] + origin[1]) / 4,
-                (verts[0][2] + verts[1][2] + verts[2][2] + origin[2]) / 4,
-            )
-        )
+    Args:
+      meshes(list): tuple of vertices (numpy array (n, 3)) and triangles (numpy array (m, 3))
+    for each mesh
+      workers(int, optional): number of worker processes, if None the CPU count is used
+    (Default value = None)
 
-        tetrahedra.append({'sign': sign, 'abs(det(J))': abs_det_J, 'J': J, 'centre_of_mass': com})
-        mesh_volume += volume
-
-    density = mass / mesh_volume
-    i = mathutils.Matrix().to_3x3()
-    i.zero()
-    for tetrahedron in tetrahedra:
-
-        J = tetrahedron['J']
-        x1 = J[0][0]
-        y1 = J[0][1]
-        z1 = J[0][2]
-        x2 = J[1][0]
-        y2 = J[1][1]
-        z2 = J[1][2]
-        x3 = J[2][0]
-        y3 = J[2][1]
-        z3 = J[2][2]
-        x4 = J[3][0]
-        y4 = J[3][1]
-        z4 = J[3][2]
-
-        abs_det_J = tetrahedron['abs(det(J))']
-        sign = tetrahedron['sign']
-
-        # TODO this might be easier with numpy (and more beautiful)
-        a = (
-            sign
-            * density
-            * abs_det_J
-            * (
-                y1 ** 2
-                + y1 * y2
-                + y2 ** 2
-                + y1 * y3
-                + y2 * y3
-                + y3 ** 2
-                + y1 * y4
-                + y2 * y4
-                + y3 * y4
-                + y4 ** 2
-                + z1 ** 2
-                + z1 * z2
-                + z2 ** 2
-                + z1 * z3
-                + z2 * z3
-                + z3 ** 2
-                + z1 * z4
-                + z2 * z4
-                + z3 * z4
-                + z4 ** 2
-            )
-            / 60
-        )
+    Returns:
+      : list -- unit density mass properties of each mesh as returned by
+      :func:`computeMeshMassProperties`
 
-        b = (
-            sign
-            * density
-            * abs_det_J
-            * (
-                x1 ** 2
-                + x1 * x2
-                + x2 ** 2
-                + x1 * x3
-                + x2 * x3
-                + x3 ** 2
-                + x1 * x4
-                + x2 * x4
-                + x3 * x4
-                + x4 ** 2
-                + z1 ** 2
-                + z1 * z2
-                + z2 ** 2
-                + z1 * z3
-                + z2 * z3
-                + z3 ** 2
-                + z1 * z4
-                + z2 * z4
-                + z3 * z4
-                + z4 ** 2
+    """
+    global meshbuffers
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    bounds = numpy.cumsum([0] + [len(triangles) for _, triangles in meshes])
+    if (
+        workers < 2
+        or bounds[-1] < PARALLEL_TRIANGLES
+        or 'fork' not in multiprocessing.get_all_start_methods()
+    ):
+        return [computeMeshMassProperties(vertices, triangles) for vertices, triangles in meshes]
+
+    offsets = numpy.cumsum([0] + [len(vertices) for vertices, _ in meshes])
+    chunks = [
+        (i, start, min(start + CHUNK_TRIANGLES, stop))
+        for i, (first, stop) in enumerate(zip(bounds[:-1], bounds[1:]))
+        for start in range(first, stop, CHUNK_TRIANGLES)
+    ]
+    meshbuffers = (
+        numpy.concatenate([numpy.asarray(vertices, dtype=float) for vertices, _ in meshes]),
+        numpy.concatenate(
+            [numpy.asarray(triangles) + offset for (_, triangles), offset in zip(meshes, offsets)]
+        ),
+    )
+    # the workers must not inherit the queue of the log writer in a locked state
+    closeLogWriter()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)), mp_context=multiprocessing.get_context('fork')
+        ) as executor:
+            results = list(
+                executor.map(
+                    computeBufferedMoments,
+                    [start for _, start, _ in chunks],
+                    [stop for _, _, stop in chunks],
+                )
             )
-            / 60
-        )
+    except (OSError, BrokenProcessPool) as e:
+        log("Could not compute mass properties in parallel: " + str(e), 'WARNING')
+        results = [computeBufferedMoments(start, stop) for _, start, stop in chunks]
+    finally:
+        meshbuffers = None
+
+    volumes = numpy.zeros(len(meshes))
+    firstmoments = numpy.zeros((len(meshes), 3))
+    secondmoments = numpy.zeros((len(meshes), 3, 3))
+    for (i, _, _), (volume, firstmoment, secondmoment) in zip(chunks, results):
+        volumes[i] += volume
+        firstmoments[i] += firstmoment
+        secondmoments[i] += secondmoment
+
+    return [
+        (volume, firstmoment / volume, secondmoment)
+        if volume != 0
+        else (0., numpy.zeros(3), numpy.zeros((3, 3)))
+        for volume, firstmoment, secondmoment in zip(volumes, firstmoments, secondmoments)
+    ]
 
-        c = (
-            sign
-            * density
-            * abs_det_J
-            * (
-                x1 ** 2
-                + x1 * x2
-                + x2 ** 2
-                + x1 * x3
-                + x2 * x3
-                + x3 ** 2
-                + x1 * x4
-                + x2 * x4
-                + x3 * x4
-                + x4 ** 2
-                + y1 ** 2
-                + y1 * y2
-                + y2 ** 2
-                + y1 * y3
-                + y2 * y3
-                + y3 ** 2
-                + y1 * y4
-                + y2 * y4
-                + y3 * y4
-                + y4 ** 2
-            )
-            / 60
-        )
 
-        a_bar = (
-            sign
-            * density
-            * abs_det_J
-            * (
-                2 * y1 * z1
-                + y2 * z1
-                + y3 * z1
-                + y4 * z1
-                + y1 * z2
-                + 2 * y2 * z2
-                + y3 * z2
-                + y4 * z2
-                + y1 * z3
-                + y2 * z3
-                + 2 * y3 * z3
-                + y4 * z3
-                + y1 * z4
-                + y2 * z4
-                + y3 * z4
-                + 2 * y4 * z4
-            )
-            / 120
-        )
+def scaleMassProperties(volume, com, secondmoment, scale):
+    """Applies the scale of an object to unit density mass properties.
 
-        b_bar = (
-            sign
-            * density
-            * abs_det_J
-            * (
-                2 * x1 * z1
-                + x2 * z1
-                + x3 * z1
-                + x4 * z1
-                + x1 * z2
-                + 2 * x2 * z2
-                + x3 * z2
-                + x4 * z2
-                + x1 * z3
-                + x2 * z3
-                + 2 * x3 * z3
-                + x4 * z3
-                + x1 * z4
-                + x2 * z4
-                + x3 * z4
-                + 2 * x4 * z4
-            )
-            / 120
-        )
+    Args:
+      volume(float): volume of the unscaled mesh
+      com(numpy.ndarray): center of mass of the unscaled mesh
+      secondmoment(numpy.ndarray): 3x3 second moment of volume of the unscaled mesh
+      scale(iterable): scale along the local axes
 
-        c_bar = (
-            sign
-            * density
-            * abs_det_J
-            * (
-                2 * x1 * y1
-                + x2 * y1
-                + x3 * y1
-                + x4 * y1
-                + x1 * y2
-                + 2 * x2 * y2
-                + x3 * y2
-                + x4 * y2
-                + x1 * y3
-                + x2 * y3
-                + 2 * x3 * y3
-                + x4 * y3
-                + x1 * y4
-                + x2 * y4
-                + x3 * y4
-                + 2 * x4 * y4
-            )
-            / 120
+    Returns:
+      : tuple -- volume, center of mass and second moment of volume of the scaled mesh
+
+    """
+    scale = numpy.array(scale, dtype=float)
+    factor = abs(numpy.prod(scale))
+    return (
+        volume * factor,
+        com * scale,
+        factor * secondmoment * scale[:, None] * scale[None, :],
+    )
+
+
+def massPropertiesToInertia(mass, volume, secondmoment):
+    """Returns the inertia tensor of a body with constant density from its mass properties.
+
+    Args:
+      mass(float): mass of the body
+      volume(float): volume of the body
+      secondmoment(numpy.ndarray): 3x3 second moment of volume relative to the origin
+
+    Returns:
+      : numpy.ndarray -- 3x3 inertia tensor relative to the origin
+
+    """
+    if volume == 0:
+        log("Mesh encloses no volume, can not calculate its inertia.", 'ERROR')
+        return numpy.zeros((3, 3))
+    inertia = -secondmoment * (mass / volume)
+    inertia[numpy.diag_indices(3)] -= numpy.trace(inertia)
+    return inertia
+
+
+def approximateMeshInertia(mass, obj, approximation='mesh', resolution=32, estimate=False):
+    """Approximates the inertia of a mesh object and optionally estimates the relative error.
+    
+    These approximations are available:
+        *mesh*: exact inertia of the closed mesh
+        *hull*: exact inertia of the convex hull, see :func:`computeConvexHull`
+        *voxel*: inertia of the voxelized mesh, see :func:`voxelizeMesh`
+        *box*, *cylinder*, *sphere*, *ellipsoid*: inertia of a primitive fitted to the bounding
+        box, see :func:`fitPrimitiveMassProperties`
+    
+    The error of the exact inertia is estimated from the holes in the mesh with
+    :func:`estimateOpenMeshError`. The error of the convex hull and the primitives is estimated
+    from their volume relative to the mesh volume in addition, which only requires
+    :func:`computeMeshVolume` instead of the full integration of the mesh. The voxelization
+    always estimates its error, see :func:`voxelizeMesh`. All errors are clamped to [0, 1].
+
+    Args:
+      mass(float): mass of the object
+      obj(bpy.types.Object): mesh object
+      approximation(str, optional): approximation to use (Default value = 'mesh')
+      resolution(int, optional): number of voxels along the largest dimension
+    (Default value = 32)
+      estimate(bool, optional): whether to estimate the error of the approximation
+    (Default value = False)
+
+    Returns:
+      : tuple -- tuple(6) of the upper diagonal of the inertia tensor relative to the origin and
+      the estimated relative error, None if it was not estimated
+
+    """
+    scale = numpy.array(obj.scale)
+    vertices, triangles, key = getMeshBuffers(obj.data)
+
+    error = None
+    if approximation == 'voxel':
+        properties, error = voxelizeMesh(vertices, triangles, resolution)
+        properties = scaleMassProperties(*properties, scale)
+    elif approximation == 'mesh':
+        properties = scaleMassProperties(
+            *getMeshMassProperties(obj.data, (vertices, triangles, key)), scale
         )
+        if estimate:
+            error = estimateOpenMeshError(vertices * scale, triangles, properties[0])
+    else:
+        if approximation == 'hull':
+            properties = scaleMassProperties(
+                *computeMeshMassProperties(*computeConvexHull(vertices)), scale
+            )
+        else:
+            properties = fitPrimitiveMassProperties(vertices * scale, approximation)
+        if estimate:
+            volume = computeMeshVolume(vertices * scale, triangles)
+            error = estimateOpenMeshError(vertices * scale, triangles, volume)
+            error = min(error + (abs(properties[0] / volume - 1) if volume else 1.), 1.)
+
+    inertia = massPropertiesToInertia(mass, properties[0], properties[2])
+    return tuple(float(value) for value in inertia[numpy.triu_indices(3)]), error
+
+
+def estimateOpenMeshError(vertices, triangles, volume):
+    """Estimates the relative error of the volume of a mesh with holes.
+    
+    The signed volume of a closed mesh does not depend on the origin. If the mesh has holes,
+    moving the origin by d changes the volume by d * A / 3, where A is the sum of the area
+    vectors of all triangles. The change for moving the origin across the bounding box is
+    returned relative to the volume and clamped to [0, 1]: 0 for a closed mesh, 1 if the mesh
+    encloses no volume or its holes change the volume at least by the volume itself.
+
+    Args:
+      vertices(numpy.ndarray): array (n, 3) of vertex coordinates
+      triangles(numpy.ndarray): array (m, 3) of vertex indices of the triangles
+      volume(float): signed volume of the mesh
+
+    Returns:
+      : float -- estimated relative error in [0, 1]
+
+    """
+    if volume == 0 or not len(triangles):
+        return 1.
+    corners = vertices[triangles]
+    area = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]).sum(axis=0)
+    extent = numpy.linalg.norm(vertices.max(axis=0) - vertices.min(axis=0))
+    return min(float(numpy.linalg.norm(area) / 2 * extent / (3 * abs(volume))), 1.)
+
+
+def computeMeshVolume(vertices, triangles):
+    """Computes the signed volume of a closed triangle mesh.
+    
+    This is much cheaper than :func:`computeMeshMassProperties` if only the volume is needed.
+
+    Args:
+      vertices(numpy.ndarray): array (n, 3) of vertex coordinates
+      triangles(numpy.ndarray): array (m, 3) of vertex indices of the triangles
+
+    Returns:
+      : float -- signed volume, positive for outward facing triangles
+
+    """
+    corners = vertices[triangles]
+    return float(
+        numpy.einsum('ij,ij->', corners[:, 0], numpy.cross(corners[:, 1], corners[:, 2])) / 6
+    )
+
+
+def computeConvexHull(vertices):
+    """Computes the convex hull of a set of vertices with bmesh.
 
-        i += inertiaListToMatrix([a, -b_bar, -c_bar, b, -a_bar, c])
+    Args:
+      vertices(numpy.ndarray): array (n, 3) of vertex coordinates
+
+    Returns:
+      : tuple -- vertices (numpy array (k, 3)) and outward facing triangles (numpy array (l, 3))
+      of the hull
+
+    """
+    import bmesh
+
+    bm = bmesh.new()
+    for co in vertices:
+        bm.verts.new(co)
+    hull = bmesh.ops.convex_hull(bm, input=bm.verts[:])
+    bmesh.ops.delete(bm, geom=hull['geom_interior'] + hull['geom_unused'], context='VERTS')
+    bmesh.ops.recalc_face_normals(bm, faces=bm.faces[:])
+    bmesh.ops.triangulate(bm, faces=bm.faces[:])
+    bm.verts.index_update()
+
+    hullvertices = numpy.array([vertex.co for vertex in bm.verts]).reshape(-1, 3)
+    hulltriangles = numpy.array(
+        [[vertex.index for vertex in face.verts] for face in bm.faces], dtype=numpy.int32
+    ).reshape(-1, 3)
+    bm.free()
+    return hullvertices, hulltriangles
+
+
+def voxelizeMesh(vertices, triangles, resolution=32):
+    """Computes the unit density mass properties of a voxelized mesh.
+    
+    The bounding box of the mesh is split into cubic voxels. Rays along each axis are cast
+    through the voxel centers with a BVH tree. A voxel counts for an axis, if its ray crossed the
+    mesh an odd number of times before reaching it. Voxels which count for at least two axes are
+    inside the mesh, so that holes only affect a single axis.
+    
+    The error is estimated from the boundary voxels, which are half inside the mesh on average,
+    and the voxels on which the axes disagree, which hint at holes.
 
-    return i[0][0], i[0][1], i[0][2], i[1][1], i[1][2], i[2][2]
+    Args:
+      vertices(numpy.ndarray): array (n, 3) of vertex coordinates
+      triangles(numpy.ndarray): array (m, 3) of vertex indices of the triangles
+      resolution(int, optional): number of voxels along the largest dimension
+    (Default value = 32)
+
+    Returns:
+      : tuple -- unit density mass properties as returned by :func:`computeMeshMassProperties`
+      and the estimated relative error
+
+    """
+    from mathutils.bvhtree import BVHTree
+
+    empty = (0., numpy.zeros(3), numpy.zeros((3, 3)))
+    if not len(triangles):
+        return empty, 1.
+    lower = vertices.min(axis=0)
+    upper = vertices.max(axis=0)
+    size = float((upper - lower).max()) / resolution
+    if size == 0:
+        return empty, 1.
+    counts = numpy.maximum(numpy.ceil((upper - lower) / size).astype(int), 1)
+    centers = [lower[axis] + (numpy.arange(counts[axis]) + 0.5) * size for axis in range(3)]
+
+    tree = BVHTree.FromPolygons(vertices.tolist(), triangles.tolist())
+    votes = numpy.zeros(counts, dtype=int)
+    for axis in range(3):
+        first, second = [other for other in range(3) if other != axis]
+        direction = mathutils.Vector(numpy.eye(3)[axis])
+        # rays of this axis along the last dimension
+        view = numpy.moveaxis(votes, axis, -1)
+        for i, u in enumerate(centers[first]):
+            for j, v in enumerate(centers[second]):
+                origin = mathutils.Vector()
+                origin[first], origin[second], origin[axis] = u, v, lower[axis] - size
+                hits = []
+                location = tree.ray_cast(origin, direction)[0]
+                while location is not None:
+                    hits.append(location[axis])
+                    # continue behind the hit, so that shared edges are only hit once
+                    location = tree.ray_cast(location + direction * size * 1e-6, direction)[0]
+                view[i, j] += numpy.searchsorted(hits, centers[axis]) % 2
+
+    inside = votes >= 2
+    count = inside.sum()
+    if not count:
+        return empty, 1.
+
+    points = numpy.stack(numpy.meshgrid(*centers, indexing='ij'), axis=-1)[inside]
+    volume = count * size ** 3
+    secondmoment = size ** 3 * points.T.dot(points) + numpy.eye(3) * volume * size ** 2 / 12
+
+    # boundary voxels have an outside neighbour along any axis
+    padded = numpy.pad(inside, 1)
+    boundary = inside & ~(
+        padded[2:, 1:-1, 1:-1]
+        & padded[:-2, 1:-1, 1:-1]
+        & padded[1:-1, 2:, 1:-1]
+        & padded[1:-1, :-2, 1:-1]
+        & padded[1:-1, 1:-1, 2:]
+        & padded[1:-1, 1:-1, :-2]
+    )
+    ambiguous = ((votes == 1) | (votes == 2)).sum()
+    error = (boundary.sum() / 2 + ambiguous) / count
+    return (volume, points.mean(axis=0), secondmoment), min(float(error), 1.)
+
+
+def fitPrimitiveMassProperties(vertices, primitive):
+    """Computes the unit density mass properties of a primitive fitted to a mesh.
+    
+    The primitive is centered in the bounding box of the vertices. Boxes and ellipsoids span the
+    bounding box, cylinders are aligned with the z axis and spheres enclose the largest
+    dimension of the bounding box. The inertias are calculated with :func:`calculateBoxInertia`
+    and its siblings.
+
+    Args:
+      vertices(numpy.ndarray): array (n, 3) of vertex coordinates
+      primitive(str): one of 'box', 'cylinder', 'sphere' or 'ellipsoid'
+
+    Returns:
+      : tuple -- unit density mass properties as returned by :func:`computeMeshMassProperties`
+
+    """
+    lower = vertices.min(axis=0)
+    upper = vertices.max(axis=0)
+    size = upper - lower
+    center = (upper + lower) / 2
+
+    if primitive == 'box':
+        volume = numpy.prod(size)
+        inertia = calculateBoxInertia(volume, size)
+    elif primitive == 'cylinder':
+        radius = size[:2].max() / 2
+        volume = math.pi * radius ** 2 * size[2]
+        inertia = calculateCylinderInertia(volume, radius, size[2])
+    elif primitive == 'sphere':
+        radius = size.max() / 2
+        volume = 4 / 3 * math.pi * radius ** 3
+        inertia = calculateSphereInertia(volume, radius)
+    elif primitive == 'ellipsoid':
+        volume = math.pi / 6 * numpy.prod(size)
+        inertia = calculateEllipsoidInertia(volume, size / 2)
+    else:
+        log("Unknown inertia approximation: " + str(primitive), 'ERROR')
+        return 0., numpy.zeros(3), numpy.zeros((3, 3))
+
+    # I = trace(C) * E - C for the second moment of volume C at the center
+    inertia = inertiaListsToMatrices([inertia])[0]
+    secondmoment = numpy.eye(3) * numpy.trace(inertia) / 2 - inertia
+    return volume, center, secondmoment + volume * numpy.outer(center, center)
 
 
 def inertiaListToMatrix(inertialist):
@@ -525,46 +988,30 @@ def fuse_inertia_data(inertials):
     expsetting = 10**(-getExpSettings().decimalPlaces)
 
     # Find objects who have some inertial data
-    for obj in inertials:
-        if not any([True for key in obj.keys() if key.startswith('inertial/')]):
-            inertials.remove(obj)
+    inertials = [
+        obj for obj in inertials if any(key.startswith('inertial/') for key in obj.keys())
+    ]
 
     # Check for an empty list -> No inertials to fuse
     if not inertials:
         return 1e-3, [0.0, 0.0, 0.0], numpy.diag([1e-3, 1e-3, 1e-3])
 
-    fused_inertia = numpy.zeros((3, 3))
-    fused_com = numpy.zeros((1, 3))
-    fused_mass = 0.0
-
-    # Calculate the fused mass and center of mass
-    fused_mass, fused_com = combine_com_3x3(inertials)
+    transforms = numpy.array([obj.matrix_local for obj in inertials])
+    fused_mass, fused_com, fused_inertia = fuseInertias(
+        numpy.array([obj['inertial/mass'] for obj in inertials], dtype=float),
+        transforms[:, :3, 3],
+        transforms[:, :3, :3],
+        inertiaListsToMatrices([list(obj['inertial/inertia']) for obj in inertials]),
+    )
+    fused_mass = float(fused_mass)
+    fused_com = mathutils.Vector(fused_com)
+    log("  Combined center of mass: " + str(fused_com), 'DEBUG')
 
     # Check for conformity
     if fused_mass <= expsetting:
         log(" Correcting fused mass : negative semidefinite value.", 'WARNING')
         fused_mass = expsetting if fused_mass < expsetting else fused_mass
 
-    # TODO Maybe we can reuse the functions defined here.
-    # Calculate the fused inertias
-    for obj in inertials:
-        # Get the rotation of the inertia
-        current_Rotation = numpy.array(obj.matrix_local.to_3x3())
-        current_Inertia = numpy.array(inertiaListToMatrix(obj['inertial/inertia']))
-        # Rotate the inertia into the current frame
-        current_Inertia = numpy.dot(
-            numpy.dot(current_Rotation.T, current_Inertia), current_Rotation
-        )
-        # Move the inertia to the center of mass
-        # Get the current relative position of the center of mass
-        relative_position = numpy.array(obj.matrix_local.translation) - fused_com
-        # Calculate the translational influence
-        current_Inertia += obj['inertial/mass'] * (
-            relative_position.T * relative_position * numpy.eye(3)
-            - numpy.outer(relative_position, relative_position)
-        )
-        fused_inertia += numpy.dot(numpy.dot(current_Rotation.T, current_Inertia), current_Rotation)
-
     # Check the inertia
     if any(element <= expsetting for element in fused_inertia.diagonal()):
         log(" Correting fused inertia : negative semidefinite diagonal entries.", 'WARNING')
@@ -583,6 +1030,50 @@ def fuse_inertia_data(inertials):
     return fused_mass, fused_com, fused_inertia
 
 
+def fuseInertias(masses, coms, rotations, inertias):
+    """Fuses the inertias of several bodies into the inertia of one rigid body.
+    
+    The inertia tensors are rotated into the common frame and moved to the combined center of
+    mass with the parallel axis theorem, all bodies at once.
+
+    Args:
+      masses(numpy.ndarray): array (n,) of the body masses
+      coms(numpy.ndarray): array (n, 3) of the centers of mass in the common frame
+      rotations(numpy.ndarray): array (n, 3, 3) of the rotations from the body frames into the
+    common frame
+      inertias(numpy.ndarray): array (n, 3, 3) of the inertia tensors at the centers of mass in
+    the body frames
+
+    Returns:
+      : tuple -- mass, center of mass (numpy array 3) and 3x3 inertia tensor (numpy array) at the
+      center of mass
+
+    """
+    mass = masses.sum()
+    com = masses.dot(coms) / mass if mass else coms.mean(axis=0)
+    offsets = coms - com
+
+    # R * I * R^T of all bodies and m * (|d|^2 * E - d * d^T) of the parallel axis theorem
+    inertia = numpy.tensordot(rotations @ inertias, rotations, axes=([0, 2], [0, 2]))
+    inertia -= numpy.einsum('ni,nj->ij', masses[:, None] * offsets, offsets)
+    inertia[numpy.diag_indices(3)] += masses.dot((offsets ** 2).sum(axis=1))
+    return mass, com, inertia
+
+
+def inertiaListsToMatrices(inertialists):
+    """Transforms several inertia lists (upper diagonal of a 3x3 tensor) into full tensors.
+
+    Args:
+      inertialists(numpy.ndarray): array (n, 6) of upper diagonals of 3x3 inertia tensors
+
+    Returns:
+      : numpy.ndarray -- array (n, 3, 3) of the full tensor matrices
+
+    """
+    inertialists = numpy.asarray(inertialists, dtype=float)
+    return inertialists[:, [0, 1, 2, 1, 3, 4, 2, 4, 5]].reshape(-1, 3, 3)
+
+
 def combine_com_3x3(objects):
     """Combines center of mass (COM) of a list of bodies given their masses and COMs.
     This code was adapted from an implementation generously provided by Bertold Bongardt.
@@ -701,29 +1192,26 @@ def compound_inertia_analysis_3x3(objects):
     Returns:
 
     """
-    total_mass, common_com = combine_com_3x3(objects)
-
-    shifted_inertias = list()
-    for obj in objects:
-        if 'rot' in obj and not obj['rot'] == mathutils.Matrix.Identity(
-            3
-        ):  # if object is rotated in local space
-            objinertia = spin_inertia_3x3(
-                inertiaListToMatrix(obj['inertia']), obj['rot']
-            )  # transform inertia to link space
-        else:
-            objinertia = inertiaListToMatrix(obj['inertia'])  # keep inertia
-        inert_i_at_common_com = shift_com_inertia_3x3(
-            obj['mass'], obj['com'], objinertia, common_com
-        )
-        shifted_inertias.append(inert_i_at_common_com)
-
-    total_inertia_at_common_com = mathutils.Matrix.Identity(3)
-    total_inertia_at_common_com.zero()
-    for inertia in shifted_inertias:
-        total_inertia_at_common_com = total_inertia_at_common_com + inertia
+    if not objects:
+        log("No proper object list...", 'DEBUG')
+        return 0.0, mathutils.Vector((0.0,) * 3), mathutils.Matrix(numpy.zeros((3, 3)).tolist())
+
+    # the inertias are rotated passively as in spin_inertia_3x3
+    rotations = numpy.array(
+        [obj['rot'] if 'rot' in obj else numpy.eye(3) for obj in objects], dtype=float
+    ).transpose(0, 2, 1)
+    total_mass, common_com, total_inertia_at_common_com = fuseInertias(
+        numpy.array([obj['mass'] for obj in objects], dtype=float),
+        numpy.array([obj['com'] for obj in objects], dtype=float),
+        rotations,
+        inertiaListsToMatrices([obj['inertia'] for obj in objects]),
+    )
 
-    return total_mass, common_com, total_inertia_at_common_com
+    return (
+        float(total_mass),
+        mathutils.Vector(common_com),
+        mathutils.Matrix(total_inertia_at_common_com.tolist()),
+    )
 
 
 def gatherInertialChilds(obj, objectlist):
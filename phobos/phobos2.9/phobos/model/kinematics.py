@@ -0,0 +1,263 @@
+#!/usr/bin/python3
+# coding=utf-8
+
+# -------------------------------------------------------------------------------
+# This file is part of Phobos, a Blender Add-On to edit robot models.
+# Copyright (C) 2020 University of Bremen & DFKI GmbH Robotics Innovation Center
+#
+# You should have received a copy of the 3-Clause BSD License in the LICENSE file.
+# If not, see <https://opensource.org/licenses/BSD-3-Clause>.
+# -------------------------------------------------------------------------------
+
+"""
+Contains functions for the batched forward kinematics of Phobos models.
+"""
+
+import numpy
+import bpy
+from phobos.phoboslog import log
+
+#: Joint types which move their child link with a single joint value.
+ACTUATED_JOINTTYPES = ('revolute', 'continuous', 'prismatic')
+
+
+def buildKinematicChain(model):
+    """Compiles the link tree of a model dictionary into arrays for forward kinematics.
+
+    The links are sorted breadth first, so that each parent precedes its children and all links
+    of one tree level are stored next to each other.
+
+    The returned dictionary contains this information:
+        *links*: list of link names in evaluation order
+        *parents*: numpy array of parent link indices (-1 for the root)
+        *levels*: list of index arrays, one per tree level
+        *origins*: numpy array (n, 4, 4) of link poses relative to their parent link
+        *axes*: numpy array (n, 3) of normalized joint axes in link coordinates
+        *types*: list of joint types moving each link (None for the root)
+        *joints*: list of joint names moving each link (None for the root)
+
+    Args:
+      model(dict): model dictionary as derived by
+    :func:`phobos.model.models.deriveModelDictionary`
+
+    Returns:
+      : dict -- compiled kinematic chain
+
+    """
+    jointsbychild = {joint['child']: joint for joint in model['joints'].values()}
+    childrenbyparent = {}
+    for linkname, link in model['links'].items():
+        childrenbyparent.setdefault(link['parent'], []).append(linkname)
+
+    links = []
+    parents = []
+    levels = []
+    level = [(root, -1) for root in sorted(childrenbyparent.get(None, []))]
+    while level:
+        levels.append(numpy.arange(len(links), len(links) + len(level)))
+        for linkname, parent in level:
+            links.append(linkname)
+            parents.append(parent)
+        level = [
+            (child, levels[-1][i])
+            for i, (linkname, _) in enumerate(level)
+            for child in sorted(childrenbyparent.get(linkname, []))
+        ]
+
+    origins = numpy.empty((len(links), 4, 4))
+    axes = numpy.zeros((len(links), 3))
+    types = []
+    joints = []
+    for i, linkname in enumerate(links):
+        origins[i] = numpy.array(model['links'][linkname]['pose']['matrix'])
+        joint = jointsbychild.get(linkname)
+        if joint and joint['type'] in ACTUATED_JOINTTYPES and 'axis' in joint:
+            axis = numpy.array(joint['axis'], dtype=float)
+            axes[i] = axis / numpy.linalg.norm(axis)
+        types.append(joint['type'] if joint else None)
+        joints.append(joint['name'] if joint else None)
+
+    return {
+        'links': links,
+        'parents': numpy.array(parents, dtype=int),
+        'levels': levels,
+        'origins': origins,
+        'axes': axes,
+        'types': types,
+        'joints': joints,
+    }
+
+
+def computeJointMotions(chain, jointnames, jointvalues):
+    """Computes the local motion of every link for a batch of joint values.
+
+    Revolute and continuous joints rotate around their axis (Rodrigues' formula), prismatic
+    joints translate along it. Links of other joint types or without a value do not move.
+
+    Args:
+      chain(dict): kinematic chain as compiled by :func:`buildKinematicChain`
+      jointnames(list): names of the joints in the columns of jointvalues
+      jointvalues(numpy.ndarray): array (samples, joints) of joint values
+
+    Returns:
+      : numpy.ndarray -- array (samples, links, 4, 4) of joint motion transforms
+
+    """
+    jointvalues = numpy.asarray(jointvalues, dtype=float).reshape(-1, len(jointnames))
+    columns = {name: i for i, name in enumerate(jointnames)}
+    samples = jointvalues.shape[0]
+    nlinks = len(chain['links'])
+
+    # joint value of each link, zero for fixed or unlisted joints
+    q = numpy.zeros((samples, nlinks))
+    revolute = numpy.zeros(nlinks, dtype=bool)
+    prismatic = numpy.zeros(nlinks, dtype=bool)
+    for i, (name, jointtype) in enumerate(zip(chain['joints'], chain['types'])):
+        if name not in columns or jointtype not in ACTUATED_JOINTTYPES:
+            continue
+        q[:, i] = jointvalues[:, columns[name]]
+        revolute[i] = jointtype != 'prismatic'
+        prismatic[i] = jointtype == 'prismatic'
+
+    axes = chain['axes']
+    cross = numpy.zeros((nlinks, 3, 3))
+    cross[:, 0, 1], cross[:, 0, 2] = -axes[:, 2], axes[:, 1]
+    cross[:, 1, 0], cross[:, 1, 2] = axes[:, 2], -axes[:, 0]
+    cross[:, 2, 0], cross[:, 2, 1] = -axes[:, 1], axes[:, 0]
+    crosssquared = cross @ cross
+
+    angles = numpy.where(revolute, q, 0.)[..., None, None]
+    motions = numpy.tile(numpy.eye(4), (samples, nlinks, 1, 1))
+    motions[..., :3, :3] += numpy.sin(angles) * cross + (1 - numpy.cos(angles)) * crosssquared
+    motions[..., :3, 3] = numpy.where(prismatic, q, 0.)[..., None] * axes
+    return motions
+
+
+def computeLinkTransforms(chain, jointnames, jointvalues, root=None):
+    """Computes the world transforms of all links for a batch of joint values.
+
+    The transforms of one tree level are computed with a single stacked matrix product, so the
+    number of Python iterations only depends on the depth of the kinematic tree.
+
+    Args:
+      chain(dict): kinematic chain as compiled by :func:`buildKinematicChain`
+      jointnames(list): names of the joints in the columns of jointvalues
+      jointvalues(numpy.ndarray): array (samples, joints) of joint values
+      root(numpy.ndarray, optional): 4x4 world transform of the model root, if None the root
+    link pose is used (Default value = None)
+
+    Returns:
+      : numpy.ndarray -- array (samples, links, 4, 4) of link world transforms
+
+    """
+    local = chain['origins'] @ computeJointMotions(chain, jointnames, jointvalues)
+    if root is not None:
+        local[:, chain['levels'][0]] = numpy.asarray(root) @ local[:, chain['levels'][0]]
+
+    transforms = numpy.empty_like(local)
+    transforms[:, chain['levels'][0]] = local[:, chain['levels'][0]]
+    for level in chain['levels'][1:]:
+        transforms[:, level] = transforms[:, chain['parents'][level]] @ local[:, level]
+    return transforms
+
+
+def matricesToQuaternions(matrices):
+    """Converts a batch of rotation matrices to a continuous sequence of quaternions.
+
+    Signs are flipped where needed so that consecutive quaternions along the first axis never
+    take the long way around, which keeps interpolated keyframes from spinning.
+
+    Args:
+      matrices(numpy.ndarray): array (samples, ..., 3, 3) of rotation matrices
+
+    Returns:
+      : numpy.ndarray -- array (samples, ..., 4) of quaternions (w, x, y, z)
+
+    """
+    m = matrices
+    trace = m[..., 0, 0] + m[..., 1, 1] + m[..., 2, 2]
+    # use the numerically most stable of the four standard formulas per matrix
+    candidates = numpy.stack(
+        [
+            trace,
+            m[..., 0, 0] - m[..., 1, 1] - m[..., 2, 2],
+            m[..., 1, 1] - m[..., 0, 0] - m[..., 2, 2],
+            m[..., 2, 2] - m[..., 0, 0] - m[..., 1, 1],
+        ],
+        axis=-1,
+    )
+    case = numpy.argmax(candidates, axis=-1)
+    s = numpy.sqrt(numpy.maximum(numpy.max(candidates, axis=-1), -1.) + 1.) * 2
+
+    quaternions = numpy.empty(m.shape[:-2] + (4,))
+    formulas = [
+        (0.25 * s, (m[..., 2, 1] - m[..., 1, 2]) / s, (m[..., 0, 2] - m[..., 2, 0]) / s,
+         (m[..., 1, 0] - m[..., 0, 1]) / s),
+        ((m[..., 2, 1] - m[..., 1, 2]) / s, 0.25 * s, (m[..., 0, 1] + m[..., 1, 0]) / s,
+         (m[..., 0, 2] + m[..., 2, 0]) / s),
+        ((m[..., 0, 2] - m[..., 2, 0]) / s, (m[..., 0, 1] + m[..., 1, 0]) / s, 0.25 * s,
+         (m[..., 1, 2] + m[..., 2, 1]) / s),
+        ((m[..., 1, 0] - m[..., 0, 1]) / s, (m[..., 0, 2] + m[..., 2, 0]) / s,
+         (m[..., 1, 2] + m[..., 2, 1]) / s, 0.25 * s),
+    ]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        for i, formula in enumerate(formulas):
+            mask = case == i
+            quaternions[mask] = numpy.stack([component[mask] for component in formula], axis=-1)
+
+    dots = numpy.sum(quaternions[1:] * quaternions[:-1], axis=-1)
+    signs = numpy.cumprod(numpy.where(dots < 0, -1., 1.), axis=0)
+    quaternions[1:] *= signs[..., None]
+    return quaternions
+
+
+def bakeLinkTransforms(objects, frames, transforms):
+    """Bakes world transforms of links into the location and quaternion F-curves of objects.
+
+    The keyframes of each F-curve are written with one bulk call. As the transforms are given in
+    world coordinates, the objects should not be parented, e.g. the baked copies of
+    :func:`phobos.model.poses.bakeModel`.
+
+    Args:
+      objects(list): bpy.types.Object for each link in chain order, None to skip a link
+      frames(numpy.ndarray): frame number of each sample
+      transforms(numpy.ndarray): array (samples, links, 4, 4) as returned by
+    :func:`computeLinkTransforms`
+
+    Returns:
+
+    """
+    frames = numpy.asarray(frames, dtype=numpy.float32)
+    locations = transforms[..., :3, 3]
+    quaternions = matricesToQuaternions(transforms[..., :3, :3])
+
+    for i, obj in enumerate(objects):
+        if obj is None:
+            continue
+        if obj.parent is not None:
+            log("Baking world transforms into parented object " + obj.name + ".", 'WARNING')
+
+        obj.rotation_mode = 'QUATERNION'
+        if obj.animation_data is None:
+            obj.animation_data_create()
+        if obj.animation_data.action is None:
+            obj.animation_data.action = bpy.data.actions.new(obj.name + 'Action')
+        action = obj.animation_data.action
+
+        for datapath, values in (
+            ('location', locations[:, i]),
+            ('rotation_quaternion', quaternions[:, i]),
+        ):
+            for index in range(values.shape[1]):
+                fcurve = action.fcurves.find(datapath, index=index)
+                if fcurve is not None:
+                    action.fcurves.remove(fcurve)
+                fcurve = action.fcurves.new(datapath, index=index, action_group=obj.name)
+
+                co = numpy.empty(2 * len(frames), dtype=numpy.float32)
+                co[0::2] = frames
+                co[1::2] = values[:, index]
+                fcurve.keyframe_points.add(len(frames))
+                fcurve.keyframe_points.foreach_set('co', co)
+                fcurve.update()
+    log("Baked {} link transforms for {} objects.".format(len(frames), len(objects)), 'INFO')
@@ -12,6 +12,7 @@
 import bpy
 import phobos.utils.selection as sUtils
 import phobos.utils.editing as eUtils
+import phobos.utils.naming as nUtils
 
 
 def addLight(light_dict):
@@ -39,7 +40,7 @@ def addLight(light_dict):
         eUtils.parentObjectsTo(light, bpy.data.objects[light_dict['parent']])
 
     light_data = light.data
-    light.name = light_dict['name']
+    nUtils.safelyName(light, light_dict['name'])
 
     colour_vals = ['r', 'g', 'b']
     colour_data = light_dict['color']['diffuse']
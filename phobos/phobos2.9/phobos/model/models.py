@@ -16,6 +16,7 @@ import json
 
 import bpy
 import mathutils
+from bpy.app.handlers import persistent
 
 import phobos.defs as defs
 import phobos.model.links as linkmodel
@@ -32,13 +33,167 @@ import phobos.utils.selection as sUtils
 import phobos.utils.blender as bUtils
 import phobos.utils.editing as eUtils
 import phobos.utils.io as ioUtils
-from phobos.utils.validation import validate
-from phobos.phoboslog import log
+from phobos.utils.validation import validate, recordValidation
+from phobos.phoboslog import log, span, annotateSpan
 from phobos.utils.general import roundFloatsInDict, sortListsInDict
 from phobos.model.poses import deriveObjectPose
 from phobos.model.geometries import deriveGeometry
 from phobos.defs import linkobjignoretypes
 
+#: :class:`DerivationCache` of each model root, see :func:`getDerivationCache`.
+derivationcaches = {}
+
+#: Number of changes reported for each object name by :func:`trackDerivationChanges`.
+derivationversions = {}
+
+
+class DerivationCache(object):
+    """Keeps the sub-dictionaries of the last derivation of a model for reuse.
+    
+    Each entry is stored with a signature of everything it was derived from. The entry is only
+    reused if the signature is unchanged, so only the parts of a model which have been edited are
+    derived again. The validation messages logged by the derivation are stored with the entry and
+    logged again whenever it is reused.
+    """
+
+    def __init__(self, context):
+        """Creates an empty cache.
+
+        Args:
+          context(tuple): derivation settings the entries are valid for
+
+        Returns:
+
+        """
+        self.context = context
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind, name, signature, derive, *args, **kwargs):
+        """Returns a copy of the cached entry or derives it anew if its signature changed.
+
+        Args:
+          kind(str): type of the entry, e.g. *link*
+          name(str): name of the object the entry is derived from
+          signature(tuple): signature of the inputs of the derivation
+          derive(function): function deriving the entry from args and kwargs
+          *args: arguments for derive
+          **kwargs: keyword arguments for derive
+
+        Returns:
+          : dict -- the derived entry
+
+        """
+        entry = self.entries.get((kind, name))
+        if entry is None or entry[0] != signature:
+            entry = (signature,) + recordValidation(derive, *args, **kwargs)
+            self.entries[(kind, name)] = entry
+            self.misses += 1
+        else:
+            self.hits += 1
+            # the validation is skipped along with the derivation
+            for message in entry[2]:
+                message.log()
+        # the model derivation edits the entries, so the cached ones are never handed out
+        return ioUtils.copy_model(entry[1])
+
+
+def getDerivationCache(root, objectlist):
+    """Returns the derivation cache of a model, which is emptied if the derivation settings changed.
+
+    Args:
+      root(bpy.types.Object): root object of the model
+      objectlist(list): objects the model is derived from
+
+    Returns:
+      : DerivationCache -- the cache of the model
+
+    """
+    selected_only = ioUtils.getExpSettings().selectedOnly
+    context = (
+        frozenset(obj.name for obj in objectlist),
+        selected_only,
+        frozenset(obj.name for obj in objectlist if obj.select_get()) if selected_only else None,
+    )
+    cache = derivationcaches.get(root.name)
+    if cache is None or cache.context != context:
+        cache = DerivationCache(context)
+        derivationcaches[root.name] = cache
+    return cache
+
+
+def getObjectSignature(obj):
+    """Returns a signature of the object data used by the derivation functions.
+    
+    Changes made through the user interface or RNA are counted by
+    :func:`trackDerivationChanges`. Names, hierarchy, transform and custom properties are also
+    compared directly, as scripts can change them without a dependency graph update in between.
+    To keep this cheap, the properties are compared in their stored order without converting
+    them to text, and :func:`deriveModelDictionary` computes each signature only once.
+
+    Args:
+      obj(bpy.types.Object): the object
+
+    Returns:
+      : tuple -- the signature
+
+    """
+    properties = []
+    for key, value in obj.items():
+        if hasattr(value, 'to_dict'):
+            value = value.to_dict()
+        elif hasattr(value, 'to_list'):
+            value = value.to_list()
+        properties.append((key, value))
+    return (
+        derivationversions.get(obj.name, 0),
+        obj.name,
+        obj.phobostype,
+        obj.parent.name if obj.parent else None,
+        # copy, as the matrix would otherwise always show the current transform
+        obj.matrix_local.copy(),
+        obj.data.name if obj.data else None,
+        obj.active_material.name if obj.active_material else None,
+        properties,
+    )
+
+
+@persistent
+def trackDerivationChanges(scene, depsgraph):
+    """Counts the changes of objects for the signatures of the derivation cache.
+    
+    This is registered as *depsgraph_update_post* handler. Updates of object data like meshes
+    or armatures empty all derivation caches, as the data can be shared by several objects.
+
+    Args:
+      scene(bpy.types.Scene): the updated scene
+      depsgraph(bpy.types.Depsgraph): the dependency graph with the updates
+
+    Returns:
+
+    """
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object):
+            name = update.id.name
+            derivationversions[name] = derivationversions.get(name, 0) + 1
+        elif isinstance(update.id, (bpy.types.Mesh, bpy.types.Armature)):
+            derivationcaches.clear()
+
+
+@persistent
+def invalidateDerivationCache(*args):
+    """Empties all derivation caches, e.g. after loading a file or undo.
+
+    Args:
+      *args: ignored
+
+    Returns:
+
+    """
+    derivationcaches.clear()
+    derivationversions.clear()
+
 
 def collectMaterials(objectlist):
     """Returns a dictionary of materials contained in a list of objects.
@@ -765,29 +920,24 @@ def deriveChainEntry(obj):
 
     """
     returnchains = []
-    if 'endChain' in obj:
-        chainlist = obj['endChain']
-    for chainName in chainlist:
-        chainclosed = False
-        parent = obj
-        chain = {'name': chainName, 'start': '', 'end': nUtils.getObjectName(obj), 'elements': []}
-        while not chainclosed:
-            # FIXME: use effectiveParent
-            if parent.parent is None:
-                log("Unclosed chain, aborting parsing chain " + chainName, "ERROR")
-                chain = None
+    for chainName in obj.get('endChain', []):
+        chain = {
+            'name': chainName,
+            'start': '',
+            'end': nUtils.getObjectName(obj),
+            'elements': [obj.name],
+        }
+        # FIXME: use effectiveParent
+        for parent in sUtils.iterAncestors(obj):
+            if chainName in parent.get('startChain', []):
+                chain['start'] = nUtils.getObjectName(parent)
+                chain['elements'].append(chain['start'])
                 break
             chain['elements'].append(parent.name)
-            # FIXME: use effectiveParent
-            parent = parent.parent
-            if 'startChain' in parent:
-                startchain = parent['startChain']
-                if chainName in startchain:
-                    chain['start'] = nUtils.getObjectName(parent)
-                    chain['elements'].append(nUtils.getObjectName(parent))
-                    chainclosed = True
-        if chain is not None:
-            returnchains.append(chain)
+        else:
+            log("Unclosed chain, aborting parsing chain " + chainName, "ERROR")
+            continue
+        returnchains.append(chain)
     return returnchains
 
 
@@ -968,6 +1118,8 @@ def namespaced(name, namespace):
     return namespace + '_' + name
 
 
+@span('derive')
+@sUtils.cacheEffectiveParents()
 def deriveModelDictionary(root, name='', objectlist=[]):
     """Returns a dictionary representation of a Phobos model.
     
@@ -994,6 +1146,7 @@ def deriveModelDictionary(root, name='', objectlist=[]):
         modelname = root['model/name']
     else:
         modelname = 'unnamed'
+    annotateSpan(model=modelname)
 
     # define model version
     if 'model/version' in root:
@@ -1033,19 +1186,61 @@ def deriveModelDictionary(root, name='', objectlist=[]):
         )
     linklist = [link for link in objectlist if link.phobostype == 'link']
 
+    # group the objects by their effective parent for the signatures of cached entries
+    cache = getDerivationCache(root, objectlist)
+    cache.hits = cache.misses = 0
+    signatures = {obj.name: getObjectSignature(obj) for obj in objectlist}
+    segments = {}
+    for obj in objectlist:
+        parent = sUtils.getEffectiveParent(obj)
+        if parent:
+            segments.setdefault(parent.name, []).append(obj)
+
+    def getLinkSignature(link):
+        """Returns the signature of all objects the link and joint of a link are derived from.
+
+        Args:
+          link(bpy.types.Object): the link object
+
+        Returns:
+          : tuple -- the signature
+
+        """
+        parent = sUtils.getEffectiveParent(link)
+        ancestors = []
+        for ancestor in sUtils.iterAncestors(link):
+            if ancestor == parent:
+                break
+            if ancestor.name not in signatures:
+                signatures[ancestor.name] = getObjectSignature(ancestor)
+            ancestors.append(signatures[ancestor.name])
+        return (
+            signatures[link.name],
+            nUtils.getObjectName(parent) if parent else None,
+            tuple(ancestors),
+            tuple(
+                nUtils.getObjectName(obj) if obj.phobostype == 'link' else signatures[obj.name]
+                for obj in segments.get(link.name, [])
+            ),
+        )
+
     # digest all the links to derive link and joint information
     log("Parsing links, joints and motors... " + (str(len(linklist))) + " total.", "INFO")
     for link in linklist:
+        linksignature = getLinkSignature(link)
+
         # parse link information (including inertia)
-        model['links'][nUtils.getObjectName(link, 'link')] = deriveLink(
-            link, logging=True, objectlist=objectlist
+        model['links'][nUtils.getObjectName(link, 'link')] = cache.get(
+            'link', link.name, linksignature, deriveLink, link, logging=True, objectlist=objectlist
         )
 
         # parse joint and motor information
         if sUtils.getEffectiveParent(link):
             # joint may be None if link is a root
             # to prevent confusion links are always defining also joints
-            jointdict = deriveJoint(link, logging=True, adjust=True)
+            jointdict = cache.get(
+                'joint', link.name, linksignature, deriveJoint, link, logging=True, adjust=True
+            )
             log("  Setting joint type '{}' for link.".format(jointdict['type']), 'DEBUG')
             # first check if we have motor information in the joint properties
             # if so they can be extended/overwritten by motor objects later on
@@ -1077,7 +1272,17 @@ def deriveModelDictionary(root, name='', objectlist=[]):
     sencons = [obj for obj in objectlist if obj.phobostype in ['sensor', 'controller']]
     log("Parsing sensors and controllers... {} total.".format(len(sencons)), 'INFO')
     for obj in sencons:
-        props = deriveDictEntry(obj, names=True, objectlist=objectlist)
+        parent = sUtils.getEffectiveParent(obj)
+        signature = (signatures[obj.name], nUtils.getObjectName(parent) if parent else None)
+        props = cache.get(
+            obj.phobostype,
+            obj.name,
+            signature,
+            deriveDictEntry,
+            obj,
+            names=True,
+            objectlist=objectlist,
+        )
         model[obj.phobostype + 's'][nUtils.getObjectName(obj)] = props
 
     # parse materials
@@ -1141,7 +1346,11 @@ def deriveModelDictionary(root, name='', objectlist=[]):
     log("Parsing lights...", "INFO")
     for obj in objectlist:
         if obj.phobostype == 'light':
-            model['lights'][nUtils.getObjectName(obj)] = deriveLight(obj)
+            parent = sUtils.getEffectiveParent(obj)
+            signature = (signatures[obj.name], nUtils.getObjectName(parent) if parent else None)
+            model['lights'][nUtils.getObjectName(obj)] = cache.get(
+                'light', obj.name, signature, deriveLight, obj
+            )
 
     # gather submechanism information from links
     log("Parsing submechanisms...", "INFO")
@@ -1184,6 +1393,10 @@ def deriveModelDictionary(root, name='', objectlist=[]):
         return mechanisms
 
     model['submechanisms'] = getSubmechanisms(root)
+    log(
+        "Reused {} and derived {} cached entries of the model.".format(cache.hits, cache.misses),
+        'DEBUG',
+    )
 
     # add additional data to model
     model.update(deriveTextData(model['name']))
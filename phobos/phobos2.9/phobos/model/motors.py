@@ -92,6 +92,7 @@ def createMotor(motor, parentobj, origin=mathutils.Matrix(), addcontrollers=Fals
     if parentobj is not None:
         sUtils.selectObjects([newmotor, parentobj], clear=True, active=1)
         bpy.ops.object.parent_set(type='BONE_RELATIVE')
+        sUtils.invalidateSceneIndex()
 
     # set motor properties
     newmotor.phobostype = 'motor'
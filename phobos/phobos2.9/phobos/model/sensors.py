@@ -183,7 +183,7 @@ def createSensor(sensor, reference, origin=mathutils.Matrix()):
 
     # set sensor properties
     newsensor.phobostype = 'sensor'
-    newsensor.name = sensor['name']
+    nUtils.safelyName(newsensor, sensor['name'])
     newsensor['sensor/name'] = sensor['name']
     newsensor['sensor/type'] = sensor['type']
 
@@ -266,7 +266,7 @@ class MoveToSceneOperator(Operator):
 
             # prepend Blender name with scenename (phobostype/names are kept anyway)
             for newobj in newobjs:
-                newobj.name = newscene.name + '_' + nUtils.getObjectName(newobj)
+                nUtils.renameObject(newobj, newscene.name + '_' + nUtils.getObjectName(newobj))
 
         # remove objects from active scene and restructure the kinematic tree
         if self.remove:
@@ -278,6 +278,7 @@ class MoveToSceneOperator(Operator):
             for obj in roots:
                 sUtils.selectObjects([obj], clear=True, active=0)
                 bpy.ops.object.parent_clear(type='CLEAR_KEEP_TRANSFORM')
+                sUtils.invalidateSceneIndex()
                 log("Cleared parent for new object root {}".format(obj.name), 'INFO')
 
         newscene.layers = bUtils.defLayers(list(range(20)))
@@ -506,6 +507,7 @@ class SetPhobosType(Operator):
 
         for obj in context.selected_objects:
             obj.phobostype = self.phobostype
+        sUtils.invalidateSceneIndex()
         return {'FINISHED'}
 
     @classmethod
@@ -1010,6 +1012,21 @@ class GenerateInertialObjectsOperator(Operator):
         description="Derive inertia value(s) from geometry of visual or collision objects.",
     )
 
+    approximation : EnumProperty(
+        items=defs.inertiaapproximations,
+        name="Approximation",
+        default='mesh',
+        description="Approximation of the inertia of mesh geometries",
+    )
+
+    resolution : IntProperty(
+        name="Resolution",
+        default=32,
+        min=2,
+        max=256,
+        description="Number of voxels along the largest dimension of voxelized meshes",
+    )
+
     clear : BoolProperty(
         name="Clear existing inertial objects",
         default=True,
@@ -1067,6 +1084,10 @@ class GenerateInertialObjectsOperator(Operator):
 
         if geometric_objects:
             layout.prop(self, 'derive_inertia_from_geometry')
+            if self.derive_inertia_from_geometry:
+                layout.prop(self, 'approximation')
+                if self.approximation == 'voxel':
+                    layout.prop(self, 'resolution')
             visuals = [obj for obj in geometric_objects if obj.phobostype == 'visual']
             collisions = [obj for obj in geometric_objects if obj.phobostype == 'collision']
 
@@ -1125,16 +1146,27 @@ class GenerateInertialObjectsOperator(Operator):
             for obj in inertial_objects:
                 bpy.data.objects.remove(obj)
 
+        masses = [self.mass] * len(objectlist)
+        if self.derive_inertia_from_geometry:
+            masses = [obj['mass'] if 'mass' in obj else self.mass for obj in objectlist]
+            # calculate all inertias at once, so the meshes are computed in parallel
+            inertias = inertialib.calculateInertias(
+                objectlist,
+                masses,
+                approximation=self.approximation,
+                resolution=self.resolution,
+                adjust=True,
+                logging=True,
+            )
+
         linkcount = len(objectlist)
         new_inertial_objects = []
-        for obj in objectlist:
+        for index, obj in enumerate(objectlist):
             i = 1
-            mass = self.mass
+            mass = masses[index]
             # calculate pose and inertia for the new object
             if self.derive_inertia_from_geometry:
-                if "mass" in obj:
-                    mass = obj["mass"]
-                inertia = inertialib.calculateInertia(obj, mass, adjust=True, logging=True)
+                inertia = inertias[index]
                 pose = obj.matrix_local.to_translation()
             else:
                 inertia = [1e-3, 0., 0., 1e-3, 0., 1e-3]
@@ -1908,6 +1940,7 @@ def addMotorFromYaml(motor_dict, annotations, selected_objs, active_obj, *args):
         # parent motor to its joint
         sUtils.selectObjects([motor_obj, joint], clear=True, active=1)
         bpy.ops.object.parent_set(type='BONE_RELATIVE')
+        sUtils.invalidateSceneIndex()
 
         newmotors.append(motor_obj)
 
@@ -26,7 +26,7 @@ from bpy.props import EnumProperty, StringProperty, FloatProperty, IntProperty,
 
 import phobos.defs as defs
 import phobos.display as display
-from phobos.phoboslog import log
+from phobos.phoboslog import log, flushLog
 import phobos.model.models as models
 import phobos.model.links as links
 import phobos.utils.selection as sUtils
@@ -72,48 +72,51 @@ class ExportSceneOperator(Operator):
         Returns:
 
         """
-        # identify all entities' roots in the scene
-        rootobjects = ioUtils.getEntityRoots()
-        if not rootobjects:
-            log("There are no entities to export!", "WARNING")
-
-        # derive entities and export if necessary
-        models = set()
-        for root in entities:
-            log("Adding entity '" + str(root["entity/name"]) + "' to scene.", "INFO")
-            if root["entity/type"] in entity_types:
-                # TODO delete me?
-                # try:
-                if (
-                    self.exportModels
-                    and 'export' in entity_types[root['entity/type']]
-                    and root['model/name'] not in models
-                ):
-                    modelpath = os.path.join(
-                        ioUtils.getExportPath(), self.sceneName, root['model/name']
+        try:
+            # identify all entities' roots in the scene
+            rootobjects = ioUtils.getEntityRoots()
+            if not rootobjects:
+                log("There are no entities to export!", "WARNING")
+
+            # derive entities and export if necessary
+            models = set()
+            for root in entities:
+                log("Adding entity '" + str(root["entity/name"]) + "' to scene.", "INFO")
+                if root["entity/type"] in entity_types:
+                    # TODO delete me?
+                    # try:
+                    if (
+                        self.exportModels
+                        and 'export' in entity_types[root['entity/type']]
+                        and root['model/name'] not in models
+                    ):
+                        modelpath = os.path.join(
+                            ioUtils.getExportPath(), self.sceneName, root['model/name']
+                        )
+                        exportModel(models.deriveModelDictionary(root), modelpath)
+                        models.add(root['model/name'])
+                    # known entity export
+                    entity = entity_types[root["entity/type"]]['derive'](
+                        root, os.path.join(ioUtils.getExportPath(), self.sceneName)
                     )
-                    exportModel(models.deriveModelDictionary(root), modelpath)
-                    models.add(root['model/name'])
-                # known entity export
-                entity = entity_types[root["entity/type"]]['derive'](
-                    root, os.path.join(ioUtils.getExportPath(), self.sceneName)
-                )
-                # TODO delete me?
-                # except KeyError:
-                #    log("Required method ""deriveEntity"" not implemented for type " + entity["entity/type"], "ERROR")
-                #    continue
-            # generic entity export
-            else:
-                entity = deriveGenericEntity(root)
-            exportlist.append(entity)
-        for scenetype in scene_types:
-            typename = "export_scene_" + scenetype
-            # check if format exists and should be exported
-            if getattr(bpy.context.scene, typename):
-                scene_types[scenetype]['export'](
-                    exportlist, os.path.join(ioUtils.getExportPath(), self.sceneName)
-                )
-        return {'FINISHED'}
+                    # TODO delete me?
+                    # except KeyError:
+                    #    log("Required method ""deriveEntity"" not implemented for type " + entity["entity/type"], "ERROR")
+                    #    continue
+                # generic entity export
+                else:
+                    entity = deriveGenericEntity(root)
+                exportlist.append(entity)
+            for scenetype in scene_types:
+                typename = "export_scene_" + scenetype
+                # check if format exists and should be exported
+                if getattr(bpy.context.scene, typename):
+                    scene_types[scenetype]['export'](
+                        exportlist, os.path.join(ioUtils.getExportPath(), self.sceneName)
+                    )
+            return {'FINISHED'}
+        finally:
+            flushLog()
 
 
 class ExportModelOperator(Operator):
@@ -161,78 +164,81 @@ class ExportModelOperator(Operator):
         Returns:
 
         """
-        roots = ioUtils.getExportModels()
-        if not roots:
-            log("No properly defined models selected or present in scene.", 'ERROR')
-            return {'CANCELLED'}
-        elif not self.exportall:
-            roots = [root for root in roots if nUtils.getModelName(root) == self.modelname]
-            if len(roots) > 1:
-                log(
-                    "Ambiguous model definitions: "
-                    + self.modelname
-                    + " exists "
-                    + str(len(roots))
-                    + " times.",
-                    "ERROR",
-                )
+        try:
+            roots = ioUtils.getExportModels()
+            if not roots:
+                log("No properly defined models selected or present in scene.", 'ERROR')
                 return {'CANCELLED'}
+            elif not self.exportall:
+                roots = [root for root in roots if nUtils.getModelName(root) == self.modelname]
+                if len(roots) > 1:
+                    log(
+                        "Ambiguous model definitions: "
+                        + self.modelname
+                        + " exists "
+                        + str(len(roots))
+                        + " times.",
+                        "ERROR",
+                    )
+                    return {'CANCELLED'}
 
-        for root in roots:
-            # setup paths
-            exportpath = ioUtils.getExportPath()
-            if not securepath(exportpath):
-                log("Could not secure path to export to.", "ERROR")
-                continue
-            log("Export path: " + exportpath, "DEBUG")
-            ioUtils.exportModel(models.deriveModelDictionary(root), exportpath)
-
-        # select all exported models after export is done
-        if ioUtils.getExpSettings().selectedOnly:
             for root in roots:
-                objectlist = sUtils.getChildren(root, selected_only=True, include_hidden=False)
-                sUtils.selectObjects(objectlist, clear=False)
-        else:
-            bpy.ops.object.select_all(action='DESELECT')
-            for root in roots:
-                sUtils.selectObjects(list([root]), False)
-            bpy.ops.phobos.select_model()
-
-        # TODO: Move mesh export to individual formats? This is practically SMURF
-        # export meshes in selected formats
-        # for meshtype in meshes.mesh_types:
-        #     mesh_path = ioUtils.getOutputMeshpath(meshtype)
-        #     try:
-        #         typename = "export_mesh_" + meshtype
-        #         if getattr(bpy.data.worlds[0], typename):
-        #             securepath(mesh_path)
-        #             for meshname in model['meshes']:
-        #                 meshes.mesh_types[meshtype]['export'](model['meshes'][meshname], mesh_path)
-        #     except KeyError:
-        #         log("No export function available for selected mesh function: " + meshtype,
-        #             "ERROR", "ExportModelOperator")
-        #         print(sys.exc_info()[0])
-
-        # TODO: Move texture export to individual formats? This is practically SMURF
-        # export textures
-        # if ioUtils.textureExportEnabled():
-        #     texture_path = ''
-        #     for materialname in model['materials']:
-        #         mat = model['materials'][materialname]
-        #         for texturetype in ['diffuseTexture', 'normalTexture', 'displacementTexture']:
-        #             if texturetype in mat:
-        #                 texpath = os.path.join(os.path.expanduser(bpy.path.abspath('//')), mat[texturetype])
-        #                 if os.path.isfile(texpath):
-        #                     if texture_path == '':
-        #                         texture_path = securepath(os.path.join(export_path, 'textures'))
-        #                         log("Exporting textures to " + texture_path, "INFO", "ExportModelOperator")
-        #                     try:
-        #                         shutil.copy(texpath, os.path.join(texture_path, os.path.basename(mat[texturetype])))
-        #                     except shutil.SameFileError:
-        #                         log("{} already in place".format(texturetype), "INFO", "ExportModelOperator")
-        # report success to user
-        log("Export successful.", "INFO", end="\n\n")
-        return {'FINISHED'}
+                # setup paths
+                exportpath = ioUtils.getExportPath()
+                if not securepath(exportpath):
+                    log("Could not secure path to export to.", "ERROR")
+                    continue
+                log("Export path: " + exportpath, "DEBUG")
+                ioUtils.exportModel(models.deriveModelDictionary(root), exportpath)
+
+            # select all exported models after export is done
+            if ioUtils.getExpSettings().selectedOnly:
+                for root in roots:
+                    objectlist = sUtils.getChildren(root, selected_only=True, include_hidden=False)
+                    sUtils.selectObjects(objectlist, clear=False)
+            else:
+                bpy.ops.object.select_all(action='DESELECT')
+                for root in roots:
+                    sUtils.selectObjects(list([root]), False)
+                bpy.ops.phobos.select_model()
+
+            # TODO: Move mesh export to individual formats? This is practically SMURF
+            # export meshes in selected formats
+            # for meshtype in meshes.mesh_types:
+            #     mesh_path = ioUtils.getOutputMeshpath(meshtype)
+            #     try:
+            #         typename = "export_mesh_" + meshtype
+            #         if getattr(bpy.data.worlds[0], typename):
+            #             securepath(mesh_path)
+            #             for meshname in model['meshes']:
+            #                 meshes.mesh_types[meshtype]['export'](model['meshes'][meshname], mesh_path)
+            #     except KeyError:
+            #         log("No export function available for selected mesh function: " + meshtype,
+            #             "ERROR", "ExportModelOperator")
+            #         print(sys.exc_info()[0])
+
+            # TODO: Move texture export to individual formats? This is practically SMURF
+            # export textures
+            # if ioUtils.textureExportEnabled():
+            #     texture_path = ''
+            #     for materialname in model['materials']:
+            #         mat = model['materials'][materialname]
+            #         for texturetype in ['diffuseTexture', 'normalTexture', 'displacementTexture']:
+            #             if texturetype in mat:
+            #                 texpath = os.path.join(os.path.expanduser(bpy.path.abspath('//')), mat[texturetype])
+            #                 if os.path.isfile(texpath):
+            #                     if texture_path == '':
+            #                         texture_path = securepath(os.path.join(export_path, 'textures'))
+            #                         log("Exporting textures to " + texture_path, "INFO", "ExportModelOperator")
+            #                     try:
+            #                         shutil.copy(texpath, os.path.join(texture_path, os.path.basename(mat[texturetype])))
+            #                     except shutil.SameFileError:
+            #                         log("{} already in place".format(texturetype), "INFO", "ExportModelOperator")
+            # report success to user
+            log("Export successful.", "INFO", end="\n\n")
+            return {'FINISHED'}
+        finally:
+            flushLog()
 
 
 class ImportModelOperator(bpy.types.Operator):
@@ -277,18 +283,21 @@ class ImportModelOperator(bpy.types.Operator):
         Returns:
 
         """
-        suffix = self.filepath.split(".")[-1]
-        if suffix in entity_io.entity_types:
-            log("Importing " + self.filepath + ' as ' + suffix, "INFO")
-            model = entity_io.entity_types[suffix]['import'](self.filepath)
-            # bUtils.cleanScene()
-            models.buildModelFromDictionary(model)
-            for layer in ['link', 'inertial', 'visual', 'collision', 'sensor']:
-                bUtils.toggleLayer(layer, True)
-        else:
-            log("No module found to import " + suffix, "ERROR")
+        try:
+            suffix = self.filepath.split(".")[-1]
+            if suffix in entity_io.entity_types:
+                log("Importing " + self.filepath + ' as ' + suffix, "INFO")
+                model = entity_io.entity_types[suffix]['import'](self.filepath)
+                # bUtils.cleanScene()
+                models.buildModelFromDictionary(model)
+                for layer in ['link', 'inertial', 'visual', 'collision', 'sensor']:
+                    bUtils.toggleLayer(layer, True)
+            else:
+                log("No module found to import " + suffix, "ERROR")
 
-        return {'FINISHED'}
+            return {'FINISHED'}
+        finally:
+            flushLog()
 
     def invoke(self, context, event):
         """
@@ -606,13 +615,13 @@ class ImportSelectedLibRobot(Operator):
                 )
             robot_obj = bpy.context.selected_objects[0]
             bpy.context.view_layer.objects.active = robot_obj
-            robot_obj.name = self.obj_name
+            robot_obj.phobostype = 'entity'
+            nUtils.safelyName(robot_obj, self.obj_name)
             robot_obj["model/name"] = selected_robot.robot_name
             robot_obj["entity/name"] = self.obj_name
             robot_obj["entity/type"] = "smurf"
             robot_obj["entity/pose"] = selected_robot.label
             robot_obj["entity/isReference"] = True
-            robot_obj.phobostype = 'entity'
         return {'FINISHED'}
 
 
@@ -651,8 +660,8 @@ class CreateRobotInstance(Operator):
         bpy.ops.import_mesh.stl(filepath=os.path.join(robot_lib[self.bakeObj], "bake.stl"))
         bpy.ops.view3d.snap_selected_to_cursor(use_offset=False)
         obj = context.active_object
-        obj.name = self.robName + "::visual"
         obj.phobostype = "visual"
+        nUtils.safelyName(obj, self.robName + "::visual")
         eUtils.parentObjectsTo(obj, root)
         return {"FINISHED"}
 
@@ -32,10 +32,12 @@ from phobos.io import scenes
 from phobos.io import libraries
 from phobos.model.models import deriveDictEntry
 from phobos.model.models import get_link_information
-from phobos.phoboslog import LOGLEVELS
+from phobos.model.models import trackDerivationChanges, invalidateDerivationCache
+from phobos.phoboslog import LOGLEVELS, invalidateLogPreferences
 import phobos.utils.validation as validation
 import phobos.utils.io as ioUtils
 import phobos.utils.naming as nUtils
+import phobos.utils.selection as sUtils
 
 
 from phobos import defs
@@ -106,15 +108,45 @@ class PhobosPrefs(AddonPreferences):
 
     logactive : BoolProperty(default=False, name='logactive', description="Activate logging")
 
-    logfile : StringProperty(name="logfile", subtype="FILE_PATH", default=".")
+    logfile : StringProperty(
+        name="logfile", subtype="FILE_PATH", default=".", update=invalidateLogPreferences
+    )
 
     loglevel : EnumProperty(
-        name="loglevel", items=tuple(((l,) * 3 for l in LOGLEVELS)), default="ERROR"
+        name="loglevel",
+        items=tuple(((l,) * 3 for l in LOGLEVELS)),
+        default="ERROR",
+        update=invalidateLogPreferences,
     )
 
-    logtofile : BoolProperty(name="logtofile", default=False)
+    logtofile : BoolProperty(name="logtofile", default=False, update=invalidateLogPreferences)
+
+    logstructured : BoolProperty(
+        name="logstructured",
+        default=False,
+        description="Write the log file as JSON lines, including the timing of processing stages",
+        update=invalidateLogPreferences,
+    )
 
-    logtoterminal : BoolProperty(name="logtoterminal", default=True)
+    logflushinterval : FloatProperty(
+        name="logflushinterval",
+        default=1.0,
+        min=0.01,
+        description="Maximum time in seconds before buffered log records are written to disk",
+        update=invalidateLogPreferences,
+    )
+
+    logbuffersize : IntProperty(
+        name="logbuffersize",
+        default=1000,
+        min=1,
+        description="Maximum number of log records waiting to be written to the log file",
+        update=invalidateLogPreferences,
+    )
+
+    logtoterminal : BoolProperty(
+        name="logtoterminal", default=True, update=invalidateLogPreferences
+    )
 
     models_poses : CollectionProperty(type=ModelPoseProp)
 
@@ -146,6 +178,9 @@ class PhobosPrefs(AddonPreferences):
         row.label(text="Logging")
         box.prop(self, "logfile", text="log file")
         box.prop(self, "logtofile", text="write to logfile")
+        box.prop(self, "logstructured", text="structured log file")
+        box.prop(self, "logflushinterval", text="log flush interval")
+        box.prop(self, "logbuffersize", text="log buffer size")
         box.prop(self, "logtoterminal", text="write to terminal")
         box.prop(self, "loglevel", text="log level")
 
@@ -1490,6 +1525,18 @@ def register():
     # register drawing functions
     display.register()
 
+    # discard the cached scene hierarchy whenever the scene changes
+    bpy.app.handlers.depsgraph_update_post.append(sUtils.invalidateSceneIndex)
+    bpy.app.handlers.load_post.append(sUtils.invalidateSceneIndex)
+    bpy.app.handlers.depsgraph_update_post.append(sUtils.invalidateNameIndex)
+    bpy.app.handlers.load_post.append(sUtils.invalidateNameIndex)
+    bpy.app.handlers.depsgraph_update_post.append(nUtils.invalidateObjectNames)
+    bpy.app.handlers.load_post.append(nUtils.invalidateObjectNames)
+    bpy.app.handlers.depsgraph_update_post.append(trackDerivationChanges)
+    bpy.app.handlers.load_post.append(invalidateDerivationCache)
+    bpy.app.handlers.undo_post.append(invalidateDerivationCache)
+    bpy.app.handlers.redo_post.append(invalidateDerivationCache)
+
     # add display properties to window manager
     bpy.types.WindowManager.draw_jointaxes = BoolProperty(name='Joint Axes', default=True)
 
@@ -1588,6 +1635,7 @@ def register():
     #             print('Error with class registration:', key, classdef)
     bpy.utils.register_class(ModelPoseProp)
     bpy.utils.register_class(PhobosPrefs)
+    invalidateLogPreferences()
     bpy.utils.register_class(PhobosExportSettings)
     # TODO delete me?
     # bpy.utils.register_class(Mesh_Export_UIList)
@@ -1641,6 +1689,21 @@ def unregister():
 
     display.unregister()
 
+    bpy.app.handlers.depsgraph_update_post.remove(sUtils.invalidateSceneIndex)
+    bpy.app.handlers.load_post.remove(sUtils.invalidateSceneIndex)
+    bpy.app.handlers.depsgraph_update_post.remove(sUtils.invalidateNameIndex)
+    bpy.app.handlers.load_post.remove(sUtils.invalidateNameIndex)
+    bpy.app.handlers.depsgraph_update_post.remove(nUtils.invalidateObjectNames)
+    bpy.app.handlers.load_post.remove(nUtils.invalidateObjectNames)
+    bpy.app.handlers.depsgraph_update_post.remove(trackDerivationChanges)
+    bpy.app.handlers.load_post.remove(invalidateDerivationCache)
+    bpy.app.handlers.undo_post.remove(invalidateDerivationCache)
+    bpy.app.handlers.redo_post.remove(invalidateDerivationCache)
+    sUtils.invalidateSceneIndex()
+    sUtils.invalidateNameIndex()
+    nUtils.invalidateObjectNames()
+    invalidateDerivationCache()
+
     # Unregister icons
     for pcoll in prev_collections.values():
         bpy.utils.previews.remove(pcoll)
@@ -1649,6 +1712,7 @@ def unregister():
     # Unregister classes
     for key, classdef in inspect.getmembers(sys.modules[__name__], inspect.isclass):
         bpy.utils.unregister_class(classdef)
+    invalidateLogPreferences()
 
     # Remove manuals from buttons
     bpy.utils.unregister_manual_map(get_operator_manuals)
@@ -9,7 +9,13 @@
 # If not, see <https://opensource.org/licenses/BSD-3-Clause>.
 # -------------------------------------------------------------------------------
 
-import inspect
+import sys
+import time
+import json
+import queue
+import atexit
+import functools
+import threading
 from datetime import datetime
 from enum import Enum
 from types import SimpleNamespace
@@ -21,9 +27,21 @@ import phobos.display as display
 #: Levels of detail for the logging information.
 LOGLEVELS = ('NONE', 'ERROR', 'WARNING', 'INFO', 'DEBUG')
 
+#: Index of each level in :data:`LOGLEVELS`, lower indices are more severe.
+LOGLEVELINDICES = {level: index for index, level in enumerate(LOGLEVELS)}
+
 #: Calling functions that will never be logged to the GUI of Blender.
 FUNCTION_BLACKLIST = 'register'
 
+#: Snapshot of the logging preferences, see :func:`getLogPreferences`.
+logpreferences = None
+
+#: Background writer of the log file, see :func:`getLogWriter`.
+logwriter = None
+
+#: Currently open timing spans, innermost last, see :class:`span`.
+spans = []
+
 
 class Col(Enum):
     """Provides the color ids for different terminal messages."""
@@ -64,6 +82,371 @@ def decorate(level):
     return level
 
 
+def getLogPreferences():
+    """Returns a snapshot of the logging preferences of Phobos.
+    
+    The snapshot is cached until :func:`invalidateLogPreferences` is called, so that a suppressed
+    log call does not have to look up the add-on preferences.
+    
+    If the Phobos preferences are not initialised yet, defaults are returned without caching them.
+
+    Args:
+
+    Returns:
+      SimpleNamespace: loglevel, its index in :data:`LOGLEVELS`, logfile, logflushinterval,
+      logbuffersize, logtofile, logtoterminal and logstructured
+
+    """
+    global logpreferences
+    if logpreferences:
+        return logpreferences
+
+    if 'phobos' in bpy.context.preferences.addons:
+        prefs = bpy.context.preferences.addons["phobos"].preferences
+    else:
+        prefs = None
+
+    # Phobos preferences might not be initialised yet! Use defaults instead.
+    if not prefs:
+        return SimpleNamespace(
+            loglevel='DEBUG',
+            loglevelindex=LOGLEVELINDICES['DEBUG'],
+            logfile='',
+            logflushinterval=1.0,
+            logbuffersize=1000,
+            logtofile=False,
+            logtoterminal=True,
+            logstructured=False,
+        )
+
+    logpreferences = SimpleNamespace(
+        loglevel=prefs.loglevel,
+        loglevelindex=LOGLEVELINDICES[prefs.loglevel],
+        logfile=prefs.logfile,
+        logflushinterval=prefs.logflushinterval,
+        logbuffersize=prefs.logbuffersize,
+        logtofile=prefs.logtofile,
+        logtoterminal=prefs.logtoterminal,
+        logstructured=prefs.logstructured,
+    )
+    return logpreferences
+
+
+def invalidateLogPreferences(*args):
+    """Clears the cached logging preferences, e.g. after the user changed them.
+    
+    The log file writer is closed as well, so that it is reopened with the new settings. No
+    buffered records are lost by this.
+    
+    Accepts and ignores any arguments, so it can be used as update function of a property.
+
+    Args:
+      *args: ignored
+
+    Returns:
+
+    """
+    global logpreferences
+    logpreferences = None
+    closeLogWriter()
+
+
+class LogWriter(object):
+    """Writes log records to a persistent file handle from a background thread.
+    
+    Records are put into a bounded queue. If the queue is full, :func:`write` blocks until the
+    writer thread has caught up, so records are never dropped. The file is flushed to disk every
+    *flushinterval* seconds and on every call of :func:`flush`.
+    """
+
+    def __init__(self, path, flushinterval=1.0, maxbuffer=1000):
+        """Opens the log file and starts the writer thread.
+
+        Args:
+          path(str): path of the log file, records are appended
+          flushinterval(float, optional): maximum time in seconds records stay in the file
+        buffer (Default value = 1.0)
+          maxbuffer(int, optional): maximum number of queued records (Default value = 1000)
+
+        Returns:
+
+        """
+        self.path = path
+        self.flushinterval = flushinterval
+        self.file = open(path, "a")
+        self.queue = queue.Queue(maxsize=max(maxbuffer, 1))
+        self.lock = threading.Lock()
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name='phobos-logwriter', daemon=True)
+        self.thread.start()
+
+    def write(self, record):
+        """Queues a record for writing.
+
+        Args:
+          record(str): text to append to the log file
+
+        Returns:
+
+        """
+        self.queue.put(record)
+
+    def run(self):
+        """Writes the queued records until the writer is closed.
+
+        Args:
+
+        Returns:
+
+        """
+        lastflush = time.monotonic()
+        closing = False
+        while not closing:
+            try:
+                records = [self.queue.get(timeout=self.flushinterval)]
+            except queue.Empty:
+                records = []
+
+            # drain everything else that is already queued in one write
+            while True:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in records:
+                closing = True
+                records = [record for record in records if record is not None]
+
+            with self.lock:
+                try:
+                    if records:
+                        self.file.write(''.join(records))
+                    if closing or time.monotonic() - lastflush >= self.flushinterval:
+                        self.file.flush()
+                        lastflush = time.monotonic()
+                except (IOError, OSError) as e:
+                    self.error = e
+            for _ in range(len(records) + (1 if closing else 0)):
+                self.queue.task_done()
+
+    def flush(self):
+        """Blocks until all queued records are written and flushed to disk.
+
+        Args:
+
+        Returns:
+
+        """
+        self.queue.join()
+        with self.lock:
+            try:
+                self.file.flush()
+            except (IOError, OSError) as e:
+                self.error = e
+
+    def close(self):
+        """Writes all queued records, stops the writer thread and closes the file.
+
+        Args:
+
+        Returns:
+
+        """
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+
+
+def getLogWriter(prefs):
+    """Returns the log file writer for the current preferences, opening it if needed.
+
+    Args:
+      prefs(SimpleNamespace): logging preferences as returned by :func:`getLogPreferences`
+
+    Returns:
+      : LogWriter -- the writer or None if the log file cannot be opened
+
+    """
+    global logwriter
+    if logwriter and logwriter.path == prefs.logfile:
+        return logwriter
+
+    closeLogWriter()
+    try:
+        logwriter = LogWriter(prefs.logfile, prefs.logflushinterval, prefs.logbuffersize)
+    except (FileNotFoundError, IsADirectoryError):
+        log("Invalid log file path, cannot write to log file!", 'ERROR', logfile=False)
+    except (IOError, OSError):
+        log("Cannot write to log file!", 'ERROR', logfile=False)
+    return logwriter
+
+
+def flushLog():
+    """Writes all buffered log records to the log file.
+    
+    This is called at the end of operators which log a lot, so that the log file is complete
+    when the operator returns.
+
+    Args:
+
+    Returns:
+
+    """
+    if logwriter:
+        logwriter.flush()
+        if logwriter.error:
+            error = logwriter.error
+            logwriter.error = None
+            log("Cannot write to log file: " + str(error), 'ERROR', logfile=False)
+
+
+@atexit.register
+def closeLogWriter():
+    """Flushes and closes the log file writer, if there is one.
+    
+    This is called when the preferences change, on unregister of the add-on and when Blender
+    exits.
+
+    Args:
+
+    Returns:
+
+    """
+    global logwriter
+    if logwriter:
+        writer = logwriter
+        logwriter = None
+        writer.close()
+
+
+class span(object):
+    """Measures the time spent in a stage of processing, e.g. the export of a model.
+    
+    Spans can be nested and used as context manager or as function decorator:
+    
+        with span('entity/urdf'):
+            ...
+    
+    When structured logging to file is enabled, a JSON record with the full span path (e.g.
+    *export/entity/urdf*), the model and the elapsed time is written when the span closes.
+    Otherwise the elapsed time is logged as DEBUG message.
+    
+    All log records written inside a span carry its path and model.
+    """
+
+    def __init__(self, name, **fields):
+        """Prepares a span, which starts when it is entered.
+
+        Args:
+          name(str): name of the stage
+          **fields: additional values for the span record, e.g. the model name as *model*
+
+        Returns:
+
+        """
+        self.name = name
+        self.fields = fields
+        self.origin = None
+
+    def __call__(self, function):
+        """Wraps a function, so that each of its calls is measured in a new span.
+
+        Args:
+          function(function): the function to measure
+
+        Returns:
+          : function -- the wrapped function
+
+        """
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            """
+
+            Args:
+              *args: 
+              **kwargs: 
+
+            Returns:
+
+            """
+            stage = span(self.name, **self.fields)
+            stage.origin = (function.__module__, function.__name__)
+            with stage:
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    def __enter__(self):
+        """Opens the span below the currently innermost one.
+
+        Args:
+
+        Returns:
+          : span -- this span
+
+        """
+        parent = spans[-1] if spans else None
+        self.path = parent.path + '/' + self.name if parent else self.name
+        if 'model' not in self.fields and parent and 'model' in parent.fields:
+            self.fields['model'] = parent.fields['model']
+        if not self.origin:
+            frame = sys._getframe(1)
+            self.origin = (frame.f_globals.get('__name__'), frame.f_code.co_name)
+        spans.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exctype, excvalue, traceback):
+        """Closes the span and logs the time spent in it.
+
+        Args:
+          exctype: 
+          excvalue: 
+          traceback: 
+
+        Returns:
+          : bool -- False, exceptions are not suppressed
+
+        """
+        elapsed = time.perf_counter() - self.start
+        spans.remove(self)
+
+        prefs = logpreferences or getLogPreferences()
+        if prefs.logtofile and prefs.logstructured:
+            writer = getLogWriter(prefs)
+            if writer:
+                record = {
+                    'time': datetime.now().isoformat(),
+                    'type': 'span',
+                    'level': 'ERROR' if exctype else 'INFO',
+                    'module': self.origin[0],
+                    'function': self.origin[1],
+                    'span': self.path,
+                    'elapsed': elapsed,
+                }
+                record.update(self.fields)
+                writer.write(json.dumps(record, default=str) + '\n')
+        else:
+            log("Stage {} took {:.3f}s.".format(self.path, elapsed), 'DEBUG')
+        return False
+
+
+def annotateSpan(**fields):
+    """Adds values to the record of the innermost open span, e.g. once the model name is known.
+    
+    Spans which are opened later inside that span inherit the model.
+
+    Args:
+      **fields: values to add to the span record
+
+    Returns:
+
+    """
+    if spans:
+        spans[-1].fields.update(fields)
+
+
 def log(message, level="INFO", prefix="", guionly=False, logfile=True, end='\n'):
     """Logs a given message to the blender console/logging file and if log level is low enough.
     
@@ -81,28 +464,16 @@ def log(message, level="INFO", prefix="", guionly=False, logfile=True, end='\n')
     Returns:
 
     """
-    frame = inspect.stack()[1][0]
-    info = inspect.getframeinfo(frame)
+    # display only messages up to preferred log level, before doing any other work
+    prefs = logpreferences or getLogPreferences()
+    if LOGLEVELINDICES[level] > prefs.loglevelindex:
+        return
+
+    frame = sys._getframe(1)
     originname = '{0} - {1} (l{2})'.format(
-        info.filename.split('addons/')[-1], info.function, info.lineno
+        frame.f_code.co_filename.split('addons/')[-1], frame.f_code.co_name, frame.f_lineno
     )
 
-    # display only messages up to preferred log level
-    if 'phobos' in bpy.context.preferences.addons:
-        prefs = bpy.context.preferences.addons["phobos"].preferences
-    else:
-        prefs = None
-
-    # Phobos preferences might not be initialised yet! Use a dummy namespace instead.
-    if not prefs:
-        prefs = SimpleNamespace()
-        prefs.loglevel = 'DEBUG'
-        prefs.logtofile = False
-        prefs.logtoterminal = True
-
-    if LOGLEVELS.index(level) > LOGLEVELS.index(prefs.loglevel):
-        return
-
     date = datetime.now().strftime("%Y%m%d_%H:%M:%S")
     # end of line will add the date and level information before the message
     if end == '\n' or end == '\n\n':
@@ -116,20 +487,31 @@ def log(message, level="INFO", prefix="", guionly=False, logfile=True, end='\n')
 
     # log to file if activated
     if prefs.logtofile and logfile and not guionly:
-        try:
-            with open(prefs.logfile, "a") as logfile:
-                logfile.write(msg + end)
-        except (FileNotFoundError, IsADirectoryError):
-            log("Invalid log file path, cannot write to log file!", 'ERROR', logfile=False)
-        except (IOError, OSError):
-            log("Cannot write to log file!", 'ERROR', logfile=False)
+        writer = getLogWriter(prefs)
+        if writer and prefs.logstructured:
+            record = {
+                'time': datetime.now().isoformat(),
+                'type': 'log',
+                'level': level,
+                'module': frame.f_globals.get('__name__'),
+                'function': frame.f_code.co_name,
+                'line': frame.f_lineno,
+                'message': message,
+            }
+            if spans:
+                record['span'] = spans[-1].path
+                record['model'] = spans[-1].fields.get('model')
+                record['elapsed'] = time.perf_counter() - spans[-1].start
+            writer.write(json.dumps(record, default=str) + '\n')
+        elif writer:
+            writer.write(msg + end)
 
     # log to terminal or Blender
     if prefs.logtoterminal and not guionly:
         print(terminalmsg, end=end)
     # log in GUI depending on loglevel
     else:
-        origin = find_calling_operator(inspect.currentframe())
+        origin = find_calling_operator(sys._getframe())
 
         # show message in Blender status bar.
         if origin:
@@ -167,6 +167,7 @@ def restructureKinematicTree(link, root=None):
     # unparent all links
     sUtils.selectObjects(links, True)
     bpy.ops.object.parent_clear(type='CLEAR_KEEP_TRANSFORM')
+    sUtils.invalidateSceneIndex()
 
     log("Restructuring objects for new hierarchy.", 'DEBUG')
     for i in range(len(links) - 1):
@@ -214,6 +215,7 @@ def parentObjectsTo(objects, parent, clear=False):
     if clear:
         sUtils.selectObjects(objects, active=0, clear=True)
         bpy.ops.object.parent_clear(type='CLEAR_KEEP_TRANSFORM')
+        sUtils.invalidateSceneIndex()
 
     sUtils.selectObjects([parent] + objects, active=0, clear=True)
 
@@ -221,6 +223,7 @@ def parentObjectsTo(objects, parent, clear=False):
         bpy.ops.object.parent_set(type='BONE_RELATIVE')
     else:
         bpy.ops.object.parent_set(type='OBJECT')
+    sUtils.invalidateSceneIndex()
 
 
 def getNearestCommonParent(objs):
@@ -567,6 +570,7 @@ def connectInterfaces(parentinterface, childinterface, transform=None):
 
     # parent interfaces
     bpy.ops.object.parent_clear(type='CLEAR_KEEP_TRANSFORM')
+    sUtils.invalidateSceneIndex()
     parentObjectsTo(childsubmodel, childinterface, clear=True)
     parentObjectsTo(childinterface, parentinterface)
 
@@ -618,6 +622,7 @@ def disconnectInterfaces(parentinterface, childinterface, transform=None):
     # unparent the child
     sUtils.selectObjects(objects=[childinterface], clear=True, active=0)
     bpy.ops.object.parent_clear(type='CLEAR_KEEP_TRANSFORM')
+    sUtils.invalidateSceneIndex()
 
     # select the former parent of the interface as new root
     if childinterface.children and len(childinterface.children) > 0:
@@ -633,6 +638,7 @@ def disconnectInterfaces(parentinterface, childinterface, transform=None):
     # restructure the kinematic tree to make the interface child of the submodel again
     sUtils.selectObjects(objects=[root], clear=True, active=0)
     bpy.ops.object.parent_clear(type='CLEAR_KEEP_TRANSFORM')
+    sUtils.invalidateSceneIndex()
     parentObjectsTo(childinterface, root)
 
     # apply additional transform
@@ -739,6 +745,7 @@ def mergeLinks(links, targetlink, movetotarget=False):
         sUtils.selectObjects([link], clear=True, active=0)
         bpy.ops.object.select_grouped(type='CHILDREN')
         bpy.ops.object.parent_clear(type='CLEAR_KEEP_TRANSFORM')
+        sUtils.invalidateSceneIndex()
         try:
             parentObjectsTo(bpy.context.selected_objects, targetlink)
         except RuntimeError as e:
@@ -16,7 +16,7 @@ import bpy
 
 from phobos import defs
 from phobos import display
-from phobos.phoboslog import log
+from phobos.phoboslog import log, span, annotateSpan
 
 from phobos.io.entities import entity_types
 from phobos.io.meshes import mesh_types
@@ -341,7 +341,7 @@ def importBlenderModel(filepath, namespace='', prefix=False):
             if prefix:
                 for obj in bpy.context.selected_objects:
                     # set prefix instead of namespace
-                    obj.name = namespace + '__' + obj.name
+                    nUtils.safelyName(obj, namespace + '__' + obj.name)
                     # make sure no internal name-properties remain
                     for key in obj.keys():
                         try:
@@ -474,6 +474,7 @@ def copy_model(model):
     )
 
 
+@span('export')
 def exportModel(model, exportpath='.', entitytypes=None):
     """Exports model to a given path in the provided formats.
 
@@ -485,6 +486,7 @@ def exportModel(model, exportpath='.', entitytypes=None):
     Returns:
 
     """
+    annotateSpan(model=model['name'])
     if not exportpath:
         exportpath = getExportPath()
     if not entitytypes:
@@ -539,7 +541,8 @@ def exportModel(model, exportpath='.', entitytypes=None):
 
         # pass a model copy to the entity export, as these might alter the dictionary
         newmodel = copy_model(model)
-        entity_types[entitytype]['export'](newmodel, model_path)
+        with span('entity/' + entitytype):
+            entity_types[entitytype]['export'](newmodel, model_path)
 
     # export meshes in selected formats
     i = 1
@@ -552,7 +555,8 @@ def exportModel(model, exportpath='.', entitytypes=None):
             if getattr(bpy.context.scene, "export_mesh_" + meshtype, False):
                 securepath(mesh_path)
                 for meshname in model['meshes']:
-                    mesh_types[meshtype]['export'](model['meshes'][meshname], mesh_path)
+                    with span('mesh/' + meshtype, mesh=meshname):
+                        mesh_types[meshtype]['export'](model['meshes'][meshname], mesh_path)
                     display.setProgress(i / n, 'Exporting ' + meshname + '.' + meshtype + '...')
                     i += 1
         except KeyError as e:
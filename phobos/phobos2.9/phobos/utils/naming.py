@@ -15,6 +15,108 @@ Contains the utility functions to rename objects, add/remove namespaces etc.
 
 import bpy
 import re
+from bpy.app.handlers import persistent
+
+#: :class:`NameAllocator` for the names of bpy.data.objects, see :func:`getUniqueObjectName`.
+objectnames = None
+
+
+class NameAllocator(object):
+    """Generates unique names like :func:`getUniqueName` for many names in a row.
+    
+    The taken names are kept in a set and the last allocated name is remembered for each base
+    name, so creating hundreds of objects with the same desired name does not probe the same
+    suffixes over and over. Released suffixed names are therefore not handed out again before the
+    allocator is seeded anew. The names are truncated to the 63 characters Blender accepts.
+    """
+
+    def __init__(self, names):
+        """Seeds the allocator with the names which are already taken.
+
+        Args:
+          names(iterable): existing names, or objects with a *name* (e.g. bpy.data.objects)
+
+        Returns:
+
+        """
+        self.taken = set(getattr(name, 'name', name) for name in names)
+        #: base name -> tuple of the next suffix number and the last allocated name
+        self.suffixes = {}
+
+    def allocate(self, newname, reserve=True):
+        """Returns a unique name for newname and marks it as taken.
+
+        Args:
+          newname(str): desired name
+          reserve(bool, optional): if False, the name is only looked up and not marked as taken
+        (Default value = True)
+
+        Returns:
+          : str -- new name that is not taken yet
+
+        """
+        # Blender would truncate longer names on its own
+        newname = newname[:63]
+        name = newname
+        if name in self.taken:
+            i, name = self.suffixes.get(newname, (0, newname))
+            while name in self.taken:
+                numberstr = '.{0:03d}'.format(i)
+                name = name[: 63 - len(numberstr)] + numberstr
+                i += 1
+            if reserve:
+                self.suffixes[newname] = (i, name)
+        if reserve:
+            self.taken.add(name)
+        return name
+
+    def release(self, name):
+        """Marks a name as free again, e.g. after an object has been renamed.
+
+        Args:
+          name(str): the name to release
+
+        Returns:
+
+        """
+        self.taken.discard(name)
+
+
+def getUniqueObjectName(newname, reserve=False):
+    """Returns a unique object name for newname.
+    
+    The allocator is seeded from bpy.data.objects once and then kept up to date by
+    :func:`safelyName`, which reserves the names it assigns. It is reseeded after changes in the
+    user interface and whenever Blender did not accept a reserved name.
+
+    Args:
+      newname(str): desired object name
+      reserve(bool, optional): if True, the name is marked as taken (Default value = False)
+
+    Returns:
+      : str -- new name that is unique in the Blender namespace
+
+    """
+    global objectnames
+    if objectnames is None:
+        objectnames = NameAllocator(bpy.data.objects)
+    return objectnames.allocate(newname, reserve=reserve)
+
+
+@persistent
+def invalidateObjectNames(*args):
+    """Discards the object name allocator, so it is seeded again from bpy.data.objects.
+    
+    This is registered as *depsgraph_update_post* and *load_post* handler.
+
+    Args:
+      *args: ignored
+
+    Returns:
+
+    """
+    global objectnames
+    objectnames = None
 
 
 def getUniqueName(newname, names):
@@ -39,6 +141,33 @@ def getUniqueName(newname, names):
     return newname
 
 
+def renameObject(obj, name):
+    """Renames a Blender object to a unique name similar to *name*, keeping the object name
+    allocator up to date.
+
+    Args:
+      obj(bpy.types.Object): object to rename
+      name(str): desired object name
+
+    Returns:
+      : str -- new name of the Blender object
+
+    """
+    from phobos.phoboslog import log
+
+    oldname = obj.name
+    objectname = getUniqueObjectName(name, reserve=True)
+    obj.name = objectname
+    if obj.name != objectname:
+        # the name was taken by an object the allocator did not know about
+        invalidateObjectNames()
+        objectname = getUniqueObjectName(name, reserve=True)
+        obj.name = objectname
+    objectnames.release(oldname)
+    log("Acquired unique name for Blender object: " + objectname, 'DEBUG')
+    return objectname
+
+
 def safelyName(obj, name, phobostype=None):
     """Assigns a name to an object in a safe way with regard to the internal
      name handling in Blender.
@@ -62,16 +191,12 @@ def safelyName(obj, name, phobostype=None):
       str: new name of the Blender object
 
     """
-    from phobos.phoboslog import log
-
     objectname = name
     if not phobostype:
         phobostype = obj.phobostype
 
-    if obj.phobostype == phobostype:
-        objectname = getUniqueName(objectname, bpy.data.objects)
-        log("Acquired unique name for Blender object: " + objectname, 'DEBUG')
-        obj.name = objectname
+    if obj.phobostype == phobostype and obj.name != objectname[:63]:
+        objectname = renameObject(obj, name)
 
     # use custom property if the object.name can not be set properly
     if objectname != name:
@@ -79,6 +204,11 @@ def safelyName(obj, name, phobostype=None):
     #elif phobostype + '/name' in obj:
     #    del obj[phobostype + '/name']
 
+    from phobos.utils.selection import updateNameIndex, invalidateSceneIndex
+
+    updateNameIndex(obj)
+    # the object was renamed and might have been given its phobostype just before
+    invalidateSceneIndex()
     return obj.name
 
 
@@ -147,9 +277,12 @@ def replaceNameElement(prop, old, new):
     Returns:
 
     """
+    from phobos.utils.selection import updateNameIndex
+
     for obj in bpy.context.selected_objects:
         if prop in obj and obj[prop].find(old) > -1:
             obj[prop] = obj[prop].replace(old, new)
+            updateNameIndex(obj)
 
 
 def addNamespaceToName(name, namespace):
@@ -13,10 +13,328 @@
 Contains the utility functions for selecting objects in Blender based on different criteria.
 """
 
+from contextlib import contextmanager
+
 import bpy
+from bpy.app.handlers import persistent
 import phobos.defs as defs
 from phobos.phoboslog import log
 
+#: Cached :class:`SceneIndex` of the current scene, see :func:`getSceneIndex`.
+sceneindex = None
+
+#: Number of hierarchy changes reported by :func:`invalidateSceneIndex`.
+scenechanges = 0
+
+#: Cached :class:`NameIndex` of all objects, see :func:`getNameIndex`.
+nameindex = None
+
+#: Stack of the memoized :class:`EffectiveParentResolver` instances of each active
+#: :func:`cacheEffectiveParents` context.
+effectiveparents = []
+
+
+class SceneIndex(object):
+    """Lookup tables for the object hierarchy of a scene.
+    
+    The tables are built in a single pass over the objects of the scene. Roots are resolved with
+    memoization, so every parent chain is only walked once.
+    
+    Changes of the hierarchy, names and phobostypes are reported to :func:`invalidateSceneIndex`
+    by the dependency graph handler and by the Phobos functions which parent, name or type
+    objects. Only this change counter and the object count are checked on a query.
+    """
+
+    def __init__(self, scene):
+        """Builds the index for the specified scene.
+
+        Args:
+          scene(bpy.types.Scene): the scene to index
+
+        Returns:
+
+        """
+        self.scenename = scene.name
+        self.version = scenechanges
+        self.objects = list(scene.objects)
+        #: object name -> position in the scene's object list
+        self.positions = {obj.name: i for i, obj in enumerate(self.objects)}
+        #: parent name -> immediate children in the scene
+        self.children = {}
+        #: phobostype -> objects of that type
+        self.phobostypes = {}
+        #: object name -> root object as returned by :func:`getRoot`
+        self.rootsbyobject = {}
+        #: root name -> objects of the scene with that root
+        self.members = {}
+        #: objects for which :func:`isRoot` is True in the scene
+        self.roots = []
+
+        for obj in self.objects:
+            self.phobostypes.setdefault(obj.phobostype, []).append(obj)
+            if obj.parent:
+                self.children.setdefault(obj.parent.name, []).append(obj)
+            self.members.setdefault(self.getRoot(obj).name, []).append(obj)
+            if isRoot(obj, scene=scene):
+                self.roots.append(obj)
+
+    def isValid(self, scene):
+        """Checks whether the index still describes the specified scene.
+
+        Args:
+          scene(bpy.types.Scene): the scene to check
+
+        Returns:
+          : bool -- True if the index can be used for the scene
+
+        """
+        return (
+            self.version == scenechanges
+            and self.scenename == scene.name
+            and len(self.objects) == len(scene.objects)
+        )
+
+    def getRoot(self, obj):
+        """Returns the root of an object like :func:`getRoot`.
+
+        Args:
+          obj(bpy.types.Object): the object to find the root for
+
+        Returns:
+          : bpy.types.Object -- the root object
+
+        """
+        path = []
+        child = obj
+        while child.name not in self.rootsbyobject and child.parent and not isRoot(child):
+            path.append(child)
+            child = child.parent
+        root = self.rootsbyobject.setdefault(child.name, child)
+        for pathobj in path:
+            self.rootsbyobject[pathobj.name] = root
+        return root
+
+    def getImmediateChildren(self, obj, phobostypes=(), selected_only=False, include_hidden=False):
+        """Returns the immediate children of an object like :func:`getImmediateChildren`.
+        
+        Traversals should fetch the index once and call this for every node, so that the index is
+        not validated again for each of them.
+
+        Args:
+          obj(bpy.types.Object): object to start search from
+          phobostypes(list of strings, optional): phobostypes to limit search to
+        (Default value = ())
+          selected_only(bool, optional): True to find only selected children (Default value = False)
+          include_hidden(bool, optional): True to include hidden objects (Default value = False)
+
+        Returns:
+          : list -- Blender objects which are immediate children of obj
+
+        """
+        if isinstance(phobostypes, str):
+            phobostypes = (phobostypes,)
+        return [
+            child
+            for child in self.children.get(obj.name, [])
+            if (child.phobostype in phobostypes if phobostypes else True)
+            and (not child.hide_viewport or include_hidden)
+            and (child.select_get() or not selected_only)
+        ]
+
+    def getObjectsByPhobostypes(self, phobostypes):
+        """Returns the objects of the specified phobostypes in scene order.
+
+        Args:
+          phobostypes(list): the phobostypes to match objects with
+
+        Returns:
+          : list -- Blender objects
+
+        """
+        if isinstance(phobostypes, str):
+            phobostypes = (phobostypes,)
+        objects = [obj for ptype in set(phobostypes) for obj in self.phobostypes.get(ptype, [])]
+        if len(phobostypes) > 1:
+            objects.sort(key=lambda obj: self.positions[obj.name])
+        return objects
+
+
+def getSceneIndex(scene=None):
+    """Returns the :class:`SceneIndex` of the current/specified scene, rebuilding it if needed.
+
+    Args:
+      scene(bpy.types.Scene, optional): the scene to index (Default value = None)
+
+    Returns:
+      : SceneIndex -- the index of the scene
+
+    """
+    global sceneindex
+    if not scene:
+        scene = bpy.context.scene
+    if sceneindex is None or not sceneindex.isValid(scene):
+        sceneindex = SceneIndex(scene)
+    return sceneindex
+
+
+@persistent
+def invalidateSceneIndex(*args):
+    """Reports a change of the object hierarchy and discards the cached :class:`SceneIndex`.
+    
+    This is registered as *depsgraph_update_post* and *load_post* handler. As the dependency
+    graph is not updated while a script is running, functions which parent, rename or retype
+    objects call it as well.
+
+    Args:
+      *args: ignored
+
+    Returns:
+
+    """
+    global sceneindex, scenechanges
+    scenechanges += 1
+    sceneindex = None
+
+
+class NameIndex(object):
+    """Lookup table from the object names and ``*/name`` custom properties to the objects of the
+    .blend file.
+    
+    Object names are indexed with the key None. Names set by
+    :func:`phobos.utils.naming.safelyName` are updated right away, all other changes are picked
+    up once the *depsgraph_update_post* handler discarded the index, see
+    :func:`invalidateNameIndex`. Hits are verified against the object before they are returned,
+    so the index can only ever miss a name which was set by a running script.
+    """
+
+    def __init__(self):
+        """Builds the index for all objects in bpy.data.
+
+        Args:
+
+        Returns:
+
+        """
+        #: name -> list of (object, property key, object pointer) tuples
+        self.entries = {}
+        #: object pointer -> list of (property key, name) tuples indexed for the object
+        self.names = {}
+        for obj in bpy.data.objects:
+            self.add(obj)
+
+    def add(self, obj):
+        """Adds the names of an object to the index.
+
+        Args:
+          obj(bpy.types.Object): the object to add
+
+        Returns:
+
+        """
+        pointer = obj.as_pointer()
+        names = [(None, obj.name)] + [
+            (key, obj[key])
+            for key in obj.keys()
+            if key.endswith('/name') and isinstance(obj[key], str)
+        ]
+        self.names[pointer] = names
+        for key, name in names:
+            self.entries.setdefault(name, []).append((obj, key, pointer))
+
+    def remove(self, obj):
+        """Removes the names of an object from the index.
+
+        Args:
+          obj(bpy.types.Object): the object to remove
+
+        Returns:
+
+        """
+        pointer = obj.as_pointer()
+        for key, name in self.names.pop(pointer, []):
+            entries = [entry for entry in self.entries[name] if entry[2] != pointer]
+            if entries:
+                self.entries[name] = entries
+            else:
+                del self.entries[name]
+
+    def find(self, name, key):
+        """Returns the objects whose custom property *key* has the value *name*.
+        
+        The objects are sorted by their object names, the order of bpy.data.objects.
+
+        Args:
+          name(str): the name to find
+          key(str): the custom property to match, e.g. *link/name*, or None for object names
+
+        Returns:
+          : list -- matching Blender objects
+
+        """
+        objects = []
+        for obj, objkey, pointer in self.entries.get(name, []):
+            if objkey != key:
+                continue
+            try:
+                if (obj.name if objkey is None else obj.get(objkey)) == name:
+                    objects.append(obj)
+            except ReferenceError:
+                # object has been removed since it was indexed
+                continue
+        return sorted(objects, key=lambda obj: obj.name)
+
+
+def getNameIndex(rebuild=False):
+    """Returns the :class:`NameIndex` of all objects, rebuilding it if objects were added or
+    removed without being reported to :func:`updateNameIndex`.
+
+    Args:
+      rebuild(bool, optional): rebuild the index in any case (Default value = False)
+
+    Returns:
+      : NameIndex -- the index of all objects
+
+    """
+    global nameindex
+    if rebuild or nameindex is None or len(nameindex.names) != len(bpy.data.objects):
+        nameindex = NameIndex()
+    return nameindex
+
+
+def updateNameIndex(obj):
+    """Updates the names of a new or renamed object in the :class:`NameIndex`.
+    
+    This is called by :func:`phobos.utils.naming.safelyName`, so naming objects during an import
+    does not require the index to be rebuilt.
+
+    Args:
+      obj(bpy.types.Object): the new or renamed object
+
+    Returns:
+
+    """
+    if nameindex is not None:
+        nameindex.remove(obj)
+        nameindex.add(obj)
+
+
+@persistent
+def invalidateNameIndex(*args):
+    """Discards the cached :class:`NameIndex`.
+    
+    This is registered as *depsgraph_update_post* and *load_post* handler, so names set outside
+    of :func:`phobos.utils.naming.safelyName` are found after the next update and the index does
+    not keep the objects of a closed file.
+
+    Args:
+      *args: ignored
+
+    Returns:
+
+    """
+    global nameindex
+    nameindex = None
+
 
 def getLeaves(roots, objects=[]):
     """Returns the links representating the leaves of the spanning tree starting with an object
@@ -31,37 +349,44 @@ def getLeaves(roots, objects=[]):
       list: List of the leaves of the kinematic spanning tree.
 
     """
-    leaves = []
-
-    if isinstance(roots, list):
-        for root in roots:
-            leaves += getLeaves(root, objects=objects)
-
-    else:
-        if roots.phobostype != 'link':
-            roots = getEffectiveParent(roots, objectlist=objects)
-
-        candidates = getImmediateChildren(roots, phobostypes=('link'))
+    return list(iterLeaves(roots, objects=objects))
 
-        if objects and candidates:
-            candidates = [candidate for candidate in candidates if candidate in objects]
 
-        if candidates:
-            leaves += getLeaves(candidates, objects=objects)
-        else:
-            leaves.append(roots)
+def iterLeaves(roots, objects=[]):
+    """Yields the leaf links of the spanning trees below the roots, see :func:`getLeaves`.
+    
+    The trees are traversed depth first with an explicit stack. The scene index is fetched once
+    and each link is visited once, so the traversal is linear in the size of the trees and can
+    be stopped at any leaf.
 
-    if objects:
-        leaves = [leave for leave in leaves if leave in objects]
+    Args:
+      roots(list of bpy.types.Object or bpy.types.Object): objects to start the search from
+      objects(list, optional): objects to which the search is restricted (Default value = [])
 
-    # Remove possible doubles
-    outputs = []
+    Returns:
+      : generator -- leaf links in depth first order
 
-    for leave in leaves:
-        if leave not in outputs:
-            outputs.append(leave)
+    """
+    objectnames = set(obj.name for obj in objects) if objects else None
+    stack = list(reversed(roots)) if isinstance(roots, list) else [roots]
+    visited = set()
+    index = getSceneIndex()
+    while stack:
+        obj = stack.pop()
+        if obj.phobostype != 'link':
+            obj = getEffectiveParent(obj, objectlist=objects)
+        if obj is None or obj.name in visited:
+            continue
+        visited.add(obj.name)
+
+        candidates = index.getImmediateChildren(obj, phobostypes=('link',))
+        if objectnames is not None:
+            candidates = [candidate for candidate in candidates if candidate.name in objectnames]
 
-    return outputs
+        if candidates:
+            stack.extend(reversed(candidates))
+        elif objectnames is None or obj.name in objectnames:
+            yield obj
 
 
 def getObjectsByPhobostypes(phobostypes):
@@ -74,7 +399,7 @@ def getObjectsByPhobostypes(phobostypes):
       : list - Blender objects.
 
     """
-    return [obj for obj in bpy.context.scene.objects if obj.phobostype in phobostypes]
+    return getSceneIndex().getObjectsByPhobostypes(phobostypes)
 
 
 def getChildren(root, phobostypes=(), selected_only=False, include_hidden=True):
@@ -91,11 +416,14 @@ def getChildren(root, phobostypes=(), selected_only=False, include_hidden=True):
       list: Blender objects which are children of root.
 
     """
+    if root is None:
+        return []
+    if isinstance(phobostypes, str):
+        phobostypes = (phobostypes,)
     return [
         child
-        for child in bpy.context.scene.objects
-        if getRoot(child) == root
-        and (child.phobostype in phobostypes if phobostypes else True)
+        for child in getSceneIndex().members.get(root.name, [])
+        if (child.phobostype in phobostypes if phobostypes else True)
         and (not child.hide_viewport or include_hidden)
         and (child.select_get() or not selected_only)
     ]
@@ -115,13 +443,7 @@ def getImmediateChildren(obj, phobostypes=(), selected_only=False, include_hidde
       : list - Blender objects which are immediate children of obj.
 
     """
-    return [
-        child
-        for child in obj.children
-        if (child.phobostype in phobostypes if phobostypes else True)
-        and (not child.hide_viewport or include_hidden)
-        and (child.select_get() or not selected_only)
-    ]
+    return getSceneIndex().getImmediateChildren(obj, phobostypes, selected_only, include_hidden)
 
 
 def getRecursiveChildren(
@@ -141,21 +463,157 @@ def getRecursiveChildren(
       list: Blender objects which are children of obj within recursion depth.
 
     """
-    if recursion_depth > -1:
-        # If no recursion, than find current children
-        children = getImmediateChildren(obj, phobostypes, selected_only, include_hidden)
-    else:
-        return []
+    return list(iterChildren(obj, recursion_depth, phobostypes, selected_only, include_hidden))
 
-    if recursion_depth > 0 and children:
-        new_children = []
-        for child in children:
-            new_children += getRecursiveChildren(
-                child, recursion_depth - 1, phobostypes, selected_only, include_hidden
+
+def iterChildren(obj, recursion_depth=0, phobostypes=(), selected_only=False, include_hidden=False):
+    """Yields the children of an object in the order of :func:`getRecursiveChildren`.
+    
+    The immediate children of an object are yielded together, followed by the children of each
+    of them in turn. Only children matching the search criteria are descended into. The tree is
+    traversed with an explicit stack, so deep serial chains neither recurse nor concatenate lists
+    and the traversal can be stopped early. The scene index is only fetched once.
+
+    Args:
+      obj(bpy.types.Object): object to start search from.
+      recursion_depth(int, optional): Depth of the recursion, None for all levels (Default value = 0)
+      phobostypes(list of strings, optional): phobostypes to limit search to. (Default value = ()
+      selected_only(bool., optional): True to find only selected children, else False. (Default value = False)
+      include_hidden(bool., optional): True to include hidden objects, else False. (Default value = False)
+
+    Returns:
+      : generator -- Blender objects which are children of obj within recursion depth.
+
+    """
+    if recursion_depth is not None and recursion_depth < 0:
+        return
+    stack = [(obj, recursion_depth)]
+    visited = set([obj.name])
+    index = getSceneIndex()
+    while stack:
+        parent, depth = stack.pop()
+        children = [
+            child
+            for child in index.getImmediateChildren(
+                parent, phobostypes, selected_only, include_hidden
             )
-        children += new_children
+            if child.name not in visited
+        ]
+        for child in children:
+            visited.add(child.name)
+            yield child
+        if depth is None or depth > 0:
+            stack.extend((child, None if depth is None else depth - 1) for child in reversed(children))
+
+
+def iterAncestors(obj):
+    """Yields the parent, grandparent etc. of an object up to the top of the hierarchy.
+
+    Args:
+      obj(bpy.types.Object): object to start from
 
-    return children
+    Returns:
+      : generator -- the ancestors of obj, nearest first
+
+    """
+    parent = obj.parent
+    while parent:
+        yield parent
+        parent = parent.parent
+
+
+class EffectiveParentResolver(object):
+    """Resolves the effective parents of objects for one objectlist and selection policy.
+    
+    The effective parent of an object equals the effective parent of its parent, if the parent
+    is skipped. Thus each object is resolved once from the nearest already resolved ancestor and
+    every ancestor chain is only walked once.
+    """
+
+    def __init__(self, objectlist=None, ignore_selection=False, include_hidden=False):
+        """Prepares the resolver for the specified objectlist and policy.
+
+        Args:
+          objectlist(list, optional): bpy.types.Object to which possible parents are restricted,
+        all objects if None (Default value = None)
+          ignore_selection(bool, optional): whether or not to use the current selection as
+        limitation (Default value = False)
+          include_hidden(bool, optional): True to include hidden objects (Default value = False)
+
+        Returns:
+
+        """
+        self.objectnames = set(obj.name for obj in objectlist) if objectlist else None
+        self.selected_only = (
+            not ignore_selection and bpy.context.scene.phobosexportsettings.selectedOnly
+        )
+        self.include_hidden = include_hidden
+        #: object name -> effective parent
+        self.parents = {}
+
+    def skip(self, parent):
+        """Returns whether the parent is not an effective parent and has to be skipped.
+
+        Args:
+          parent(bpy.types.Object): the parent to check
+
+        Returns:
+          : bool -- True if the search continues with the parent of parent
+
+        """
+        if self.objectnames is not None and parent.name not in self.objectnames:
+            return False
+        return (
+            (parent.hide_viewport and not self.include_hidden)
+            or (self.selected_only and not parent.select_get())
+            or parent.phobostype != 'link'
+        )
+
+    def getParent(self, obj):
+        """Returns the effective parent of an object like :func:`getEffectiveParent`.
+
+        Args:
+          obj(bpy.types.Object): object of which to find the parent
+
+        Returns:
+          : bpy.types.Object -- the effective parent or None
+
+        """
+        chain = []
+        child = obj
+        while child.name not in self.parents:
+            chain.append(child)
+            if not child.parent or not self.skip(child.parent):
+                self.parents[child.name] = child.parent
+                break
+            child = child.parent
+
+        parent = self.parents[child.name]
+        for chainobj in chain:
+            self.parents[chainobj.name] = parent
+        return parent
+
+
+@contextmanager
+def cacheEffectiveParents():
+    """Memoizes effective parents within the context, e.g. during the derivation of a model.
+    
+    The object hierarchy, selection and visibility must not change within the context. Each
+    context, also a nested one, starts with its own resolvers, which are dropped when it is left.
+    Also usable as a function decorator, which scopes the resolvers to the decorated call.
+
+    Args:
+
+    Returns:
+
+    """
+    resolvers = {}
+    effectiveparents.append(resolvers)
+    try:
+        yield
+    finally:
+        effectiveparents.pop()
+        resolvers.clear()
 
 
 def getEffectiveParent(obj, ignore_selection=False, include_hidden=False, objectlist=[]):
@@ -172,25 +630,19 @@ def getEffectiveParent(obj, ignore_selection=False, include_hidden=False, object
     Returns:
 
     """
-    if not objectlist:
-        objectlist = list(bpy.data.objects)
-
-    parent = obj.parent
-    while (
-        parent
-        and parent in objectlist
-        and (
-            (parent.hide_viewport and not include_hidden)
-            or (
-                not parent.select_get()
-                and bpy.context.scene.phobosexportsettings.selectedOnly
-                and not ignore_selection
-            )
-            or parent.phobostype != 'link'
+    if not effectiveparents:
+        return EffectiveParentResolver(objectlist, ignore_selection, include_hidden).getParent(obj)
+
+    # the resolver only belongs to the very same objectlist, not to one reusing its id
+    objectlist = objectlist if objectlist else None
+    key = (id(objectlist), bool(ignore_selection), bool(include_hidden))
+    resolvers = effectiveparents[-1]
+    if key not in resolvers or resolvers[key][0] is not objectlist:
+        resolvers[key] = (
+            objectlist,
+            EffectiveParentResolver(objectlist, ignore_selection, include_hidden),
         )
-    ):
-        parent = parent.parent
-    return parent
+    return resolvers[key][1].getParent(obj)
 
 
 def getRoot(obj=None, verbose=True):
@@ -229,7 +681,7 @@ def getRoots(scene=None):
     if not scene:
         scene = bpy.context.scene
 
-    roots = [obj for obj in scene.objects if isRoot(obj, scene=scene)]
+    roots = list(getSceneIndex(scene).roots)
     if roots is None:
         log("No root objects found in scene {}.".format(scene), 'WARNING')
     else:
@@ -315,21 +767,19 @@ def getObjectByName(name, phobostypes=()):
       : bpy.types.Object or list - one or list of objects matching name
 
     """
-    objlist = []
-    searchobjs = [
-        obj for obj in bpy.context.scene.objects if obj.phobostype in phobostypes or not phobostypes
-    ]
-    for obj in searchobjs:
-        if name == obj.name:
-            objlist.append(obj)
-        else:
-            for key in obj.keys():
-                try:
-                    if obj[key].endswith('/name') and name == obj[key]:
-                        objlist.append(obj)
-                except AttributeError:
-                    continue
-    return objlist[0] if len(objlist) == 1 else objlist
+    if isinstance(phobostypes, str):
+        phobostypes = (phobostypes,)
+    scene = bpy.context.scene
+    objects = [obj for obj in getNameIndex().find(name, None) if scene.objects.get(obj.name)]
+    if not objects:
+        # the object might have been renamed by a running script
+        obj = scene.objects.get(name)
+        if obj is None:
+            return []
+        updateNameIndex(obj)
+        objects = [obj]
+    objects = [obj for obj in objects if obj.phobostype in phobostypes or not phobostypes]
+    return objects[0] if len(objects) == 1 else objects
 
 
 def getObjectsByPattern(pattern, match_case=False):
@@ -375,9 +825,9 @@ def getObjectByNameAndType(name, phobostype):
     """
     # FIXME: make this API-compatible with geObjectByName
     name_tag = phobostype + "/name"
-    for obj in bpy.data.objects:
-        if name_tag in obj and name == obj[name_tag]:
-            return obj
+    objects = getNameIndex().find(name, name_tag)
+    if objects:
+        return objects[0]
     log("No object of type " + phobostype + " with name " + name + " found.", "WARNING")
     return None
 
@@ -19,6 +19,9 @@ from phobos.phoboslog import log
 
 checkMessages = {"NoObject": []}
 
+#: Lists collecting the logged :class:`ValidateMessage` objects, see :func:`recordValidation`.
+validationrecords = []
+
 
 def generateCheckMessages(param1, param2):
     """
@@ -265,6 +268,8 @@ class ValidateMessage:
 
     def log(self):
         """TODO Missing documentation"""
+        for messages in validationrecords:
+            messages.append(self)
         log(
             self.message
             + str(
@@ -559,7 +564,7 @@ def validateMaterial(material, adjust=False):
     return errors, material
 
 
-def validateGeometryType(obj, *args, adjust=False, geometry_dict=None):
+def validateGeometryType(obj, *args, adjust=False, geometry_dict=None, **kwargs):
     """
 
     Args:
@@ -567,6 +572,7 @@ def validateGeometryType(obj, *args, adjust=False, geometry_dict=None):
       *args: 
       adjust: (Default value = False)
       geometry_dict: (Default value = None)
+      **kwargs: further arguments of the validated function, which are ignored
 
     Returns:
 
@@ -775,6 +781,27 @@ def validateVisual(obj, *args, adjust=False, geometry_dict=None):
     return errors
 
 
+def recordValidation(function, *args, **kwargs):
+    """Calls a function and collects the validation messages logged while it runs.
+
+    Args:
+      function(function): function to call
+      *args: arguments for function
+      **kwargs: keyword arguments for function
+
+    Returns:
+      : tuple -- the return value of function and the list of logged ValidateMessages
+
+    """
+    messages = []
+    validationrecords.append(messages)
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        validationrecords.pop()
+    return result, messages
+
+
 def validate(name):
     """
 
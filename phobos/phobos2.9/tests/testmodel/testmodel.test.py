@@ -8,14 +8,27 @@
 # If not, see <https://opensource.org/licenses/BSD-3-Clause>.
 # -------------------------------------------------------------------------------
 
+import math
 import sys
 import unittest
+import unittest.mock
 
 try:
+    import bpy
+    import numpy
     import phobos
 
     class TestInertiaModel(unittest.TestCase):
 
+        def setUp(self):
+            # box of size [1, 2, 3] around the origin with outward facing triangles
+            self.vertices = numpy.array(
+                [[x, y, z] for x in (-.5, .5) for y in (-1, 1) for z in (-1.5, 1.5)])
+            quads = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4),
+                     (1, 5, 7, 3)]
+            self.triangles = numpy.array(
+                [tri for a, b, c, d in quads for tri in ((a, b, c), (a, c, d))])
+
         def test_calculateBoxInertia(self):
             mass = 12
             size = [1, 2, 3]
@@ -50,6 +63,100 @@ try:
             self.assertTupleEqual(phobos.model.inertia.calculateEllipsoidInertia(mass, size),
                                   result)
 
+        def test_computeMeshInertia(self):
+            mass = 12
+            result = [[13., 0., 0.], [0., 10., 0.], [0., 0., 5.]]
+
+            volume, com, inertia = phobos.model.inertia.computeMeshInertia(
+                mass, self.vertices, self.triangles)
+            self.assertAlmostEqual(volume, 6.)
+            self.assertListEqual([round(val, 6) for val in com], [0., 0., 0.])
+            self.assertListEqual([[round(val, 6) for val in row] for row in inertia.tolist()],
+                                 result)
+
+        def test_computeMassPropertiesParallel(self):
+            meshes = [(self.vertices, self.triangles),
+                      (self.vertices * 2 + [1., 2., 3.], self.triangles)]
+            serial = [phobos.model.inertia.computeMeshMassProperties(*mesh) for mesh in meshes]
+
+            # split the small meshes into several chunks
+            limits = phobos.model.inertia.PARALLEL_TRIANGLES, phobos.model.inertia.CHUNK_TRIANGLES
+            phobos.model.inertia.PARALLEL_TRIANGLES, phobos.model.inertia.CHUNK_TRIANGLES = 0, 5
+            try:
+                # without fork, the parallel computation falls back to the serial one
+                for workers in (2, 1):
+                    results = phobos.model.inertia.computeMassPropertiesParallel(meshes, workers)
+                    for result, target in zip(results, serial):
+                        self.assertAlmostEqual(result[0], target[0])
+                        self.assertTrue(numpy.allclose(result[1], target[1]))
+                        self.assertTrue(numpy.allclose(result[2], target[2]))
+            finally:
+                (phobos.model.inertia.PARALLEL_TRIANGLES,
+                 phobos.model.inertia.CHUNK_TRIANGLES) = limits
+
+        def test_scaleMassProperties(self):
+            volume = 1.
+            com = numpy.array([1., 0., 0.])
+            # unit cube around (1, 0, 0)
+            secondmoment = numpy.diag([13., 1., 1.]) / 12
+            result = [[6.5, 0., 0.], [0., 2., 0.], [0., 0., 4.5]]
+
+            volume, com, secondmoment = phobos.model.inertia.scaleMassProperties(
+                volume, com, secondmoment, (1, 2, 3))
+            self.assertAlmostEqual(volume, 6.)
+            self.assertListEqual(com.tolist(), [1., 0., 0.])
+            self.assertListEqual(
+                [[round(val, 6) for val in row] for row in secondmoment.tolist()], result)
+
+        def test_fitPrimitiveMassProperties(self):
+            mass = 12
+            result = [[13., 0., 0.], [0., 10., 0.], [0., 0., 5.]]
+
+            volume, com, secondmoment = phobos.model.inertia.fitPrimitiveMassProperties(
+                self.vertices, 'box')
+            inertia = phobos.model.inertia.massPropertiesToInertia(mass, volume, secondmoment)
+            self.assertAlmostEqual(volume, 6.)
+            self.assertListEqual(com.tolist(), [0., 0., 0.])
+            self.assertListEqual([[round(val, 6) for val in row] for row in inertia.tolist()],
+                                 result)
+
+        def test_voxelizeMesh(self):
+            mass = 12
+            result = [[13., 0., 0.], [0., 10., 0.], [0., 0., 5.]]
+
+            # the voxels fill the box exactly
+            (volume, com, secondmoment), error = phobos.model.inertia.voxelizeMesh(
+                self.vertices, self.triangles, resolution=12)
+            inertia = phobos.model.inertia.massPropertiesToInertia(mass, volume, secondmoment)
+            self.assertAlmostEqual(volume, 6.)
+            self.assertListEqual([round(val, 6) for val in com], [0., 0., 0.])
+            self.assertListEqual([[round(val, 6) for val in row] for row in inertia.tolist()],
+                                 result)
+            self.assertGreater(error, 0.)
+            self.assertLessEqual(error, 1.)
+
+        def test_estimateOpenMeshError(self):
+            self.assertAlmostEqual(
+                phobos.model.inertia.estimateOpenMeshError(self.vertices, self.triangles, 6.), 0.)
+            # removing a side of the box leaves a hole
+            self.assertGreater(phobos.model.inertia.estimateOpenMeshError(
+                self.vertices, self.triangles[2:], 6.), 0.)
+
+        def test_fuseInertias(self):
+            masses = numpy.array([1., 1.])
+            coms = numpy.array([[1., 0., 0.], [-1., 0., 0.]])
+            # the first body is rotated by 90 degrees around the z axis
+            rotations = numpy.array([[[0., -1., 0.], [1., 0., 0.], [0., 0., 1.]], numpy.eye(3)])
+            inertias = phobos.model.inertia.inertiaListsToMatrices([[1, 0, 0, 2, 0, 3], [0] * 6])
+            result = [[2., 0., 0.], [0., 3., 0.], [0., 0., 5.]]
+
+            mass, com, inertia = phobos.model.inertia.fuseInertias(
+                masses, coms, rotations, inertias)
+            self.assertEqual(mass, 2.)
+            self.assertListEqual(com.tolist(), [0., 0., 0.])
+            self.assertListEqual(
+                [[round(val, 6) for val in row] for row in inertia.tolist()], result)
+
         def test_inertiaListToMatrix(self):
             inertialist = [1, 2, 3, 4, 5, 6]
             result = [[1., 2., 3.], [2., 4., 5.], [3., 5., 6.]]
@@ -66,8 +173,120 @@ try:
 
             # TODO continue with joints
 
+    class TestDerivationCache(unittest.TestCase):
+
+        def setUp(self):
+            self.obj = bpy.data.objects.new('derivationtest_link', None)
+            bpy.context.scene.collection.objects.link(self.obj)
+            self.obj.phobostype = 'link'
+            self.cache = phobos.model.models.DerivationCache(())
+
+        def tearDown(self):
+            bpy.data.objects.remove(self.obj)
+
+        @staticmethod
+        def deriveEntry(obj):
+            return {'name': obj.name}
+
+        def derive(self):
+            signature = phobos.model.models.getObjectSignature(self.obj)
+            return self.cache.get('link', self.obj.name, signature, self.deriveEntry, self.obj)
+
+        def test_get(self):
+            entry = self.derive()
+            self.assertDictEqual(entry, {'name': self.obj.name})
+            # the cached entry is never handed out
+            entry['name'] = 'changed'
+            self.assertDictEqual(self.derive(), {'name': self.obj.name})
+            self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        def test_get_validation(self):
+            message = phobos.utils.validation.ValidateMessage(
+                "No joint parent!", 'WARNING', information={})
+
+            def deriveEntry(obj):
+                message.log()
+                return {'name': obj.name}
+
+            signature = phobos.model.models.getObjectSignature(self.obj)
+            with unittest.mock.patch.object(phobos.utils.validation, 'log') as log:
+                self.cache.get('link', self.obj.name, signature, deriveEntry, self.obj)
+                self.cache.get('link', self.obj.name, signature, deriveEntry, self.obj)
+            # the message is logged again for the cached entry
+            self.assertEqual(log.call_count, 2)
+            self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        def test_get_property(self):
+            self.obj['link/name'] = 'arm'
+            self.derive()
+            self.obj['link/name'] = 'leg'
+            self.derive()
+            self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+            self.obj['link/collision_bitmask'] = [1, 0]
+            self.derive()
+            self.obj['link/collision_bitmask'][1] = 1
+            self.derive()
+            self.assertEqual((self.cache.hits, self.cache.misses), (0, 4))
+
+        def test_get_transform(self):
+            self.derive()
+            self.obj.location = (1., 0., 0.)
+            bpy.context.view_layer.update()
+            self.derive()
+            self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+            self.derive()
+            self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    class TestKinematicsModel(unittest.TestCase):
+
+        @staticmethod
+        def translation(x, y, z):
+            return [[1, 0, 0, x], [0, 1, 0, y], [0, 0, 1, z], [0, 0, 0, 1]]
+
+        def setUp(self):
+            self.model = {
+                'links': {
+                    'base': {'parent': None, 'pose': {'matrix': self.translation(0, 0, 1)}},
+                    'arm': {'parent': 'base', 'pose': {'matrix': self.translation(1, 0, 0)}},
+                    'slider': {'parent': 'arm', 'pose': {'matrix': self.translation(0, 1, 0)}},
+                },
+                'joints': {
+                    'shoulder': {'name': 'shoulder', 'parent': 'base', 'child': 'arm',
+                                 'type': 'revolute', 'axis': [0, 0, 2]},
+                    'rail': {'name': 'rail', 'parent': 'arm', 'child': 'slider',
+                             'type': 'prismatic', 'axis': [0, 0, 1]},
+                },
+            }
+
+        def test_buildKinematicChain(self):
+            chain = phobos.model.kinematics.buildKinematicChain(self.model)
+            self.assertListEqual(chain['links'], ['base', 'arm', 'slider'])
+            self.assertListEqual(list(chain['parents']), [-1, 0, 1])
+            self.assertListEqual(list(chain['axes'][1]), [0., 0., 1.])
+
+        def test_computeLinkTransforms(self):
+            chain = phobos.model.kinematics.buildKinematicChain(self.model)
+            values = [[0., 0.], [math.pi / 2, 0.5]]
+            transforms = phobos.model.kinematics.computeLinkTransforms(
+                chain, ['shoulder', 'rail'], values)
+            self.assertEqual(transforms.shape, (2, 3, 4, 4))
+            result = [[0., 0., 1.], [1., 0., 1.], [0., 0., 1.5]]
+            self.assertListEqual(
+                [[round(val, 6) for val in row] for row in transforms[1, :, :3, 3].tolist()],
+                result)
+
+        def test_matricesToQuaternions(self):
+            matrices = [[[0., -1., 0.], [1., 0., 0.], [0., 0., 1.]]] * 2
+            quaternions = phobos.model.kinematics.matricesToQuaternions(numpy.array(matrices))
+            result = [round(math.sqrt(0.5), 6), 0., 0., round(math.sqrt(0.5), 6)]
+            self.assertListEqual([round(val, 6) for val in quaternions[1]], result)
+
     # we have to manually invoke the test runner here, as we cannot use the CLI
-    suite = unittest.defaultTestLoader.loadTestsFromTestCase(TestInertiaModel)
+    suite = unittest.TestSuite([
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestInertiaModel),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestDerivationCache),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestKinematicsModel),
+    ])
     success = unittest.TextTestRunner().run(suite)
 
     if success.errors or success.failures:
@@ -12,6 +12,7 @@ import sys
 import unittest
 
 try:
+    import bpy
     import mathutils as mathutils
     import phobos
 
@@ -137,6 +138,146 @@ try:
             self.assertListEqual(list(list(elem) for elem in
                                       phobos.utils.general.outerProduct(a, b)), result)
 
+    class TestSelectionUtils(unittest.TestCase):
+
+        def setUp(self):
+            self.objects = []
+            self.root = self.newObject('selectiontest_root', 'link')
+            self.child = self.newObject('selectiontest_child', 'link', self.root)
+            self.visual = self.newObject('selectiontest_visual', 'visual', self.child)
+            self.reportChange()
+
+        def tearDown(self):
+            for obj in self.objects:
+                try:
+                    bpy.data.objects.remove(obj)
+                except ReferenceError:
+                    continue
+            self.reportChange()
+
+        def newObject(self, name, phobostype, parent=None):
+            obj = bpy.data.objects.new(name, None)
+            bpy.context.scene.collection.objects.link(obj)
+            obj.phobostype = phobostype
+            obj.parent = parent
+            self.objects.append(obj)
+            return obj
+
+        @staticmethod
+        def reportChange():
+            # the dependency graph handlers are not run while the test script is running
+            phobos.utils.selection.invalidateSceneIndex()
+            phobos.utils.selection.invalidateNameIndex()
+
+        def immediateChildren(self, obj):
+            return sorted(
+                child.name for child in phobos.utils.selection.getImmediateChildren(obj))
+
+        def test_getImmediateChildren_deletion(self):
+            self.assertListEqual(self.immediateChildren(self.root), [self.child.name])
+            bpy.data.objects.remove(self.child)
+            # a changed object count is detected without a report
+            self.assertListEqual(self.immediateChildren(self.root), [])
+            self.newObject('selectiontest_other', 'link', self.root)
+            self.reportChange()
+            self.assertListEqual(self.immediateChildren(self.root), ['selectiontest_other'])
+
+        def test_getSceneIndex_reuse(self):
+            index = phobos.utils.selection.getSceneIndex()
+            self.assertIs(phobos.utils.selection.getSceneIndex(), index)
+            self.reportChange()
+            self.assertIsNot(phobos.utils.selection.getSceneIndex(), index)
+
+        def test_getImmediateChildren_renaming(self):
+            self.assertListEqual(self.immediateChildren(self.child), [self.visual.name])
+            phobos.utils.naming.safelyName(self.child, 'selectiontest_renamed')
+            self.assertListEqual(self.immediateChildren(self.root), [self.child.name])
+            self.assertListEqual(self.immediateChildren(self.child), [self.visual.name])
+
+        def test_getImmediateChildren_reparenting(self):
+            self.assertListEqual(self.immediateChildren(self.root), [self.child.name])
+            self.visual.parent = self.root
+            self.reportChange()
+            self.assertListEqual(self.immediateChildren(self.root),
+                                 sorted([self.child.name, self.visual.name]))
+            self.assertListEqual(self.immediateChildren(self.child), [])
+
+        def test_getRoots_reparenting(self):
+            self.assertIn(self.root, phobos.utils.selection.getRoots())
+            self.assertNotIn(self.child, phobos.utils.selection.getRoots())
+            self.child.parent = None
+            self.reportChange()
+            self.assertIn(self.child, phobos.utils.selection.getRoots())
+            self.assertEqual(phobos.utils.selection.getRoot(self.visual), self.child)
+            self.child.phobostype = 'visual'
+            self.reportChange()
+            self.assertNotIn(self.child, phobos.utils.selection.getRoots())
+
+        def test_getRecursiveChildren(self):
+            self.assertListEqual(phobos.utils.selection.getRecursiveChildren(
+                self.root, recursion_depth=None), [self.child, self.visual])
+            self.assertListEqual(phobos.utils.selection.getRecursiveChildren(self.root),
+                                 [self.child])
+            self.assertListEqual(phobos.utils.selection.getLeaves([self.root]), [self.child])
+
+        def test_cacheEffectiveParents(self):
+            objectlist = [self.root, self.child, self.visual]
+            with self.assertRaises(ValueError):
+                with phobos.utils.selection.cacheEffectiveParents():
+                    self.assertEqual(phobos.utils.selection.getEffectiveParent(
+                        self.visual, objectlist=objectlist), self.child)
+                    # a nested context does not reuse the resolvers of the outer one
+                    self.visual.parent = self.root
+                    with phobos.utils.selection.cacheEffectiveParents():
+                        self.assertEqual(phobos.utils.selection.getEffectiveParent(
+                            self.visual, objectlist=objectlist), self.root)
+                    raise ValueError
+            # the resolvers are dropped, even if the context is left with an exception
+            self.assertListEqual(phobos.utils.selection.effectiveparents, [])
+
+        def test_getObjectByName(self):
+            self.assertEqual(phobos.utils.selection.getObjectByName(self.root.name), self.root)
+            self.assertEqual(
+                phobos.utils.selection.getObjectByName(self.visual.name, 'visual'), self.visual)
+            self.assertListEqual(
+                phobos.utils.selection.getObjectByName(self.visual.name, 'link'), [])
+            self.assertListEqual(phobos.utils.selection.getObjectByName('selectiontest'), [])
+            # a name property of another object does not make the result ambiguous
+            self.visual['visual/name'] = self.root.name
+            self.assertEqual(phobos.utils.selection.getObjectByName(self.root.name), self.root)
+            # renaming without updating the name index
+            self.root.name = 'selectiontest_renamed'
+            self.assertListEqual(phobos.utils.selection.getObjectByName('selectiontest_root'), [])
+            self.assertEqual(
+                phobos.utils.selection.getObjectByName('selectiontest_renamed'), self.root)
+
+        def test_getObjectByNameAndType_renaming(self):
+            self.child['link/name'] = 'arm'
+            self.assertEqual(phobos.utils.selection.getObjectByNameAndType('arm', 'link'),
+                             self.child)
+            # the object name is taken, so the name is stored in link/name
+            phobos.utils.naming.safelyName(self.child, self.root.name, 'link')
+            self.assertEqual(
+                phobos.utils.selection.getObjectByNameAndType(self.root.name, 'link'), self.child)
+            self.assertIsNone(phobos.utils.selection.getObjectByNameAndType('arm', 'link'))
+            # renaming without updating the name index
+            self.root['link/name'] = 'arm'
+            self.assertIsNone(phobos.utils.selection.getObjectByNameAndType('arm', 'link'))
+            self.reportChange()
+            self.assertEqual(phobos.utils.selection.getObjectByNameAndType('arm', 'link'),
+                             self.root)
+            self.assertIsNone(phobos.utils.selection.getObjectByNameAndType('arm', 'visual'))
+
+        def test_getObjectByNameAndType_duplicates(self):
+            self.root['link/name'] = 'arm'
+            self.child['link/name'] = 'arm'
+            # the first object in bpy.data.objects is returned, as before
+            self.assertEqual(phobos.utils.selection.getObjectByNameAndType('arm', 'link'),
+                             self.child)
+            bpy.data.objects.remove(self.child)
+            self.assertEqual(phobos.utils.selection.getObjectByNameAndType('arm', 'link'),
+                             self.root)
+
     class TestIOUtils(unittest.TestCase):
 
         def test_xmlline(self):
@@ -174,6 +315,56 @@ try:
             target = 'b' * 59 + '.000'
             self.assertEqual(phobos.utils.naming.getUniqueName(testname, testlist), target)
 
+            # the suffix is appended to the last name tried
+            testname = 'bert'
+            testlist = ['bert', 'bert.000']
+            target = 'bert.000.001'
+            self.assertEqual(phobos.utils.naming.getUniqueName(testname, testlist), target)
+
+        def test_NameAllocator_collisions(self):
+            allocator = phobos.utils.naming.NameAllocator(['gunther', 'bert', 'walter'])
+            for target in ('bert.000', 'bert.000.001', 'bert.000.001.002'):
+                # the names match the ones of getUniqueName
+                self.assertEqual(phobos.utils.naming.getUniqueName('bert', allocator.taken),
+                                 target)
+                self.assertEqual(allocator.allocate('bert'), target)
+            self.assertEqual(allocator.allocate('walter', reserve=False), 'walter.000')
+            self.assertEqual(allocator.allocate('walter', reserve=False), 'walter.000')
+            self.assertEqual(allocator.allocate('hans'), 'hans')
+            self.assertEqual(allocator.allocate('hans'), 'hans.000')
+
+        def test_NameAllocator_truncation(self):
+            allocator = phobos.utils.naming.NameAllocator(['gunther'])
+            self.assertEqual(allocator.allocate('b' * 70), 'b' * 63)
+            self.assertEqual(allocator.allocate('b' * 70), 'b' * 59 + '.000')
+            self.assertEqual(allocator.allocate('b' * 63), 'b' * 59 + '.001')
+
+        def test_NameAllocator_release(self):
+            allocator = phobos.utils.naming.NameAllocator(['bert'])
+            self.assertEqual(allocator.allocate('bert'), 'bert.000')
+            self.assertEqual(allocator.allocate('bert'), 'bert.000.001')
+            allocator.release('bert.000')
+            # the suffix counter is kept, so released suffixes are not probed again
+            self.assertEqual(allocator.allocate('bert'), 'bert.000.001.002')
+            self.assertNotIn('bert.000', allocator.taken)
+            allocator.release('bert')
+            self.assertEqual(allocator.allocate('bert'), 'bert')
+
+        def test_safelyName_truncation(self):
+            obj = bpy.data.objects.new('namingtest', None)
+            obj.phobostype = 'link'
+            try:
+                phobos.utils.naming.getUniqueObjectName('namingtest')
+                allocator = phobos.utils.naming.objectnames
+                self.assertEqual(phobos.utils.naming.safelyName(obj, 'n' * 70), 'n' * 63)
+                self.assertEqual(obj['link/name'], 'n' * 70)
+                # the allocator was not seeded again
+                self.assertIs(phobos.utils.naming.objectnames, allocator)
+                self.assertIn('n' * 63, allocator.taken)
+                self.assertNotIn('namingtest', allocator.taken)
+            finally:
+                bpy.data.objects.remove(obj)
+
         def test_isValidModelname(self):
             testname = 'helloworld'
             self.assertTrue(phobos.utils.naming.isValidModelname(testname))
@@ -216,12 +407,14 @@ try:
     # we have to manually invoke the test runner here, as we cannot use the CLI
     blenderutilstest = unittest.defaultTestLoader.loadTestsFromTestCase(TestBlenderUtils)
     generalutilstest = unittest.defaultTestLoader.loadTestsFromTestCase(TestGeneralUtils)
+    selectionutilstest = unittest.defaultTestLoader.loadTestsFromTestCase(TestSelectionUtils)
     ioutilstest = unittest.defaultTestLoader.loadTestsFromTestCase(TestIOUtils)
     namingutilstest = unittest.defaultTestLoader.loadTestsFromTestCase(TestNamingUtils)
 
     results = []
     results.append(unittest.TextTestRunner().run(blenderutilstest))
     results.append(unittest.TextTestRunner().run(generalutilstest))
+    results.append(unittest.TextTestRunner().run(selectionutilstest))
     results.append(unittest.TextTestRunner().run(ioutilstest))
     results.append(unittest.TextTestRunner().run(namingutilstest))
 
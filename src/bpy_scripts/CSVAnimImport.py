@@ -1,5 +1,8 @@
-import bpy, csv
-from math import radians
+import bpy, csv, hashlib, itertools, json, os
+import numpy as np
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil, floor, radians
 
 # ----------------------
 #       CONSTANTS
@@ -7,7 +10,8 @@ from math import radians
 #  Set these before running script as needed
 MOTION_FILE_PATH = r'C:\Users\cocot\Downloads\9H7G_condition_1_camera_trial1_W3C.csv'
 FRAMES_PER_SECOND = bpy.context.scene.render.fps
-AXES = {  # Which axis (local) to rotate each joint on
+AXES = {  # Which axis (local) to rotate/move each joint on, overrides "joint/axis",
+          # prefix with "-" to move in the negative direction, e.g. "-Z"
     "j0": "Z",
     "j1": "Y",
     "j2": "X",
@@ -16,6 +20,40 @@ AXES = {  # Which axis (local) to rotate each joint on
     "j5": "Y",
     "j6": "X"
 }
+IMPORT_MODE = "BULK"  # "BULK" fills F-curves directly, "STREAM" reads the file in chunks,
+                      # "LIVE" poses joints on frame change without keyframes,
+                      # "KEYFRAME" inserts one keyframe at a time
+USE_CACHE = True  # Keep a parsed binary copy of the trajectory next to the csv file
+CHUNK_SIZE = 100000  # Rows read at once in "STREAM" mode
+RESAMPLE = None  # "LINEAR" or "CUBIC" writes exactly one keyframe per render frame,
+                # None keeps the original sample times
+DECIMATE_TOLERANCE = None  # Max joint error (radians or meters) when dropping keyframes,
+                           # None keeps every sample
+CHECK_LIMITS = True  # Report joint limit and velocity violations before importing
+MANIFEST = None  # List of {"file": csv path, "root": robot root object name,
+                 # "prefix": joint object name prefix, "axes": axes dict} to import
+                 # several trajectories at once instead of MOTION_FILE_PATH.
+                 # "root", "prefix" and "axes" are optional. Always imported
+                 # like IMPORT_MODE "BULK".
+
+AXIS_INDEX = {"X": 0, "Y": 1, "Z": 2}
+# Columns named "<joint>:<component>" drive one DOF of a multi-DOF joint
+COMPONENTS = {
+    "x": ("translation", 0), "y": ("translation", 1), "z": ("translation", 2),
+    "rx": ("rotation_euler", 0), "ry": ("rotation_euler", 1), "rz": ("rotation_euler", 2),
+}
+# Custom properties that may hold a joint's max velocity, as read by Phobos
+VELOCITY_PROPERTIES = ("joint/limits/velocity", "joint/maxSpeed", "joint/maxspeed",
+                       "joint/maxVelocity", "joint/maxvelocity")
+LINEAR_INTERPOLATION = 1  # Keyframe interpolation enum value of 'LINEAR'
+
+# Trajectory played back by liveFrameChangeHandler in "LIVE" mode
+LIVE_STATE = {}
+
+# The property a csv column drives: getattr(owner, prop)[index], which is
+# data_path[index] of obj's action. The column values are multiplied by sign.
+JointChannel = namedtuple("JointChannel", "obj owner prop index data_path sign",
+                          defaults=(1.0,))
 
 def lprint(message, mode="OUTPUT"):
     """
@@ -34,10 +72,79 @@ def getJointsFromHeaders(headers):
         if name == 'time':
             continue
         
-        dict[name] = bpy.data.objects[name]
+        dict[name] = bpy.data.objects[name.partition(":")[0]]
     
     return dict
 
+def getJointAxis(obj, col, axes=AXES):
+    """
+    Get the local axis a single DOF joint object moves along
+    --
+    returns (axis index, sign), sign is -1.0 for a negative axis like (0, 0, -1)
+    """
+    if col in axes or isinstance(obj.get("joint/axis"), str):
+        axis = axes[col] if col in axes else obj["joint/axis"]
+        return AXIS_INDEX[axis.lstrip("+-").upper()], -1.0 if axis.startswith("-") else 1.0
+    
+    axis = obj.get("joint/axis")
+    if axis is not None:
+        index = int(np.argmax(np.abs(axis)))
+        return index, -1.0 if axis[index] < 0 else 1.0
+    
+    raise KeyError("No axis defined for joint " + col + ", add it to AXES")
+
+def compileJointMap(objs, joints, axes=AXES):
+    """
+    Compile every csv column to the F-curve channel it drives
+    --
+    Phobos links (armatures with a "joint/type") move their bone along or
+    around its Y axis, which Phobos aligns with the joint axis, unless AXES
+    names another one. Plain objects rotate around their axis, or move along
+    it via delta_location so that their rest location is kept. Multi-DOF
+    joints need one "<joint>:<component>" column per DOF.
+    returns dict of column name:JointChannel
+    """
+    channels = {}
+    for col in joints:
+        obj = objs[col]
+        component = col.partition(":")[2]
+        jointtype = obj.get("joint/type", "revolute")
+        
+        if obj.type == 'ARMATURE' and "joint/type" in obj:
+            owner = obj.pose.bones[0]
+            path = 'pose.bones["' + owner.name + '"].'
+            translation = "location"
+        else:
+            owner = obj
+            path = ""
+            translation = "delta_location"
+        
+        sign = 1.0
+        if component:
+            prop, index = COMPONENTS[component]
+        elif jointtype in ("revolute", "continuous"):
+            prop, index = "rotation_euler", None
+        elif jointtype == "prismatic":
+            prop, index = "translation", None
+        else:
+            raise ValueError("Joint " + col + " of type " + jointtype
+                             + " needs one '<joint>:<component>' column per DOF")
+        
+        if prop == "translation":
+            prop = translation
+        if index is None:
+            if path and col not in axes:
+                index = 1
+            else:
+                index, sign = getJointAxis(obj, col, axes)
+        if prop == "rotation_euler" and len(owner.rotation_mode) != 3:
+            # Quaternion and axis angle rotations ignore rotation_euler
+            owner.rotation_mode = 'XYZ'
+        
+        channels[col] = JointChannel(obj, owner, prop, index, path + prop, sign)
+    
+    return channels
+
 def readCSVAnimationFile(fp):
     """
     Main function to read csv animation and output keyframes
@@ -50,6 +157,7 @@ def readCSVAnimationFile(fp):
         
         headers = None
         objs = None
+        channels = None
         
         lprint("File read successfully, importing keyframes")
         
@@ -58,6 +166,8 @@ def readCSVAnimationFile(fp):
                 # Title
                 headers = row
                 objs = getJointsFromHeaders(headers)
+                channels = compileJointMap(
+                    objs, [col for col in headers if col != "time"])
                 continue
             
             time = 0
@@ -67,32 +177,907 @@ def readCSVAnimationFile(fp):
                     time = float(val.replace(',',''))
                     continue
                 
-                # Save original rotation
-                orig_rot = objs[col].rotation_euler.copy()
-                objs[col].rotation_euler = [0,0,0]
-                
-                # Set obj rot from csv data
-                rot_value = float(val.replace(',',''))
-                objs[col].rotation_euler.rotate_axis(AXES[col], rot_value)
+                # Set joint value from csv data
+                channel = channels[col]
+                getattr(channel.owner, channel.prop)[channel.index] = \
+                    channel.sign * float(val.replace(',',''))
                 
                 # Insert the new keyframe
                 frame = int(time * FRAMES_PER_SECOND)
                 print("Adding keyframe: [" + str(frame) + "]", end='\r')
-                objs[col].keyframe_insert(data_path="rotation_euler",
-                                            frame=frame)
+                channel.obj.keyframe_insert(data_path=channel.data_path,
+                                            index=channel.index, frame=frame)
                 
-                # Reset rotation back to where it was
-                objs[col].rotation_euler = [0,0,0]
+                # Reset joint back to its zero'd position
+                getattr(channel.owner, channel.prop)[channel.index] = 0
             
-            for col in headers:
-                if col == "time":
-                    continue
-                
-                objs[col].rotation_euler = [0,0,0]
-                objs[col].keyframe_insert(data_path="rotation_euler",
-                                            frame=-1)
+            for channel in channels.values():
+                getattr(channel.owner, channel.prop)[channel.index] = 0
+                channel.obj.keyframe_insert(data_path=channel.data_path,
+                                            index=channel.index, frame=-1)
             
     lprint("Done loading csv animation.")
 
+def parseCSVLines(lines):
+    """
+    Parse csv body lines into a samples x columns float array in one pass
+    --
+    Cells with thousands separators have to be quoted, in which case we fall
+    back to the csv module to split them.
+    """
+    if any('"' in line for line in lines):
+        rows = [[float(val.replace(',','')) for val in row]
+                for row in csv.reader(lines) if row]
+        return np.array(rows, dtype=np.float64)
+    
+    return np.loadtxt(lines, delimiter=',', dtype=np.float64, ndmin=2)
+
+def hashFile(fp):
+    """
+    Hash file contents in blocks, without holding the file in memory
+    """
+    sha = hashlib.sha1()
+    with open(fp, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    
+    return sha.hexdigest()
+
+def getCacheDir(fp):
+    """
+    Get the sidecar cache directory of a csv file
+    """
+    return fp + ".cache"
+
+def readTrajectoryCache(fp):
+    """
+    Memory-map the cached trajectory of a csv file if it is still valid
+    --
+    The cache is valid if size and mtime match, or if the size matches and
+    the content hash is unchanged (e.g. the file was copied or touched).
+    returns (joint headers, time array, joints x samples array) or None
+    """
+    cache = getCacheDir(fp)
+    try:
+        with open(os.path.join(cache, "meta.json")) as metafile:
+            meta = json.load(metafile)
+    except (OSError, ValueError):
+        return None
+    
+    stat = os.stat(fp)
+    if meta["size"] != stat.st_size:
+        return None
+    if meta["mtime"] != stat.st_mtime_ns:
+        if meta["hash"] != hashFile(fp):
+            return None
+        meta["mtime"] = stat.st_mtime_ns
+        with open(os.path.join(cache, "meta.json"), 'w') as metafile:
+            json.dump(meta, metafile)
+    
+    return (meta["joints"],
+            np.load(os.path.join(cache, "time.npy"), mmap_mode='r'),
+            np.load(os.path.join(cache, "joints.npy"), mmap_mode='r'))
+
+def writeTrajectoryCache(fp, joints, times, values):
+    """
+    Write a parsed trajectory to the sidecar cache of a csv file
+    """
+    cache = getCacheDir(fp)
+    os.makedirs(cache, exist_ok=True)
+    
+    # Meta is written last, so an interrupted write never looks valid
+    metapath = os.path.join(cache, "meta.json")
+    if os.path.exists(metapath):
+        os.remove(metapath)
+    
+    np.save(os.path.join(cache, "time.npy"), times)
+    np.save(os.path.join(cache, "joints.npy"), values)
+    
+    stat = os.stat(fp)
+    meta = {"size": stat.st_size, "mtime": stat.st_mtime_ns,
+            "hash": hashFile(fp), "joints": joints}
+    with open(metapath, 'w') as metafile:
+        json.dump(meta, metafile)
+
+def loadTrajectory(fp, use_cache=USE_CACHE):
+    """
+    Load a csv animation file into numpy columns
+    --
+    returns (joint headers, time array, joints x samples float32 array)
+    """
+    if use_cache:
+        cached = readTrajectoryCache(fp)
+        if cached is not None:
+            lprint("Using cached trajectory from: " + getCacheDir(fp))
+            return cached
+    
+    with open(fp) as csvfile:
+        headers = next(csv.reader([csvfile.readline()]))
+        data = parseCSVLines(csvfile.readlines())
+    
+    data = data.reshape(-1, len(headers)).T
+    joint_cols = [i for i, col in enumerate(headers) if col != "time"]
+    joints = [headers[i] for i in joint_cols]
+    times = np.ascontiguousarray(data[headers.index("time")])
+    values = np.ascontiguousarray(data[joint_cols], dtype=np.float32)
+    
+    if use_cache:
+        try:
+            writeTrajectoryCache(fp, joints, times, values)
+        except OSError as e:
+            lprint("Could not write trajectory cache: " + str(e), "WARNING")
+    
+    return joints, times, values
+
+def mapTrajectory(fp):
+    """
+    Load a csv animation file and memory-map it from its cache
+    --
+    On the first run the parsed arrays are replaced by the cache that was
+    just written, so they do not stay in memory. If the cache could not be
+    written, the parsed arrays are returned.
+    returns (joint headers, time array, joints x samples array)
+    """
+    joints, times, values = loadTrajectory(fp, use_cache=True)
+    if not isinstance(values, np.memmap):
+        cached = readTrajectoryCache(fp)
+        if cached is not None:
+            return cached
+    return joints, times, values
+
+def getAction(obj):
+    """
+    Get the action animating obj, creating animation data and action as needed
+    """
+    if obj.animation_data is None:
+        obj.animation_data_create()
+    if obj.animation_data.action is None:
+        obj.animation_data.action = bpy.data.actions.new(obj.name + "Action")
+    
+    return obj.animation_data.action
+
+def newFCurve(action, data_path, index, group):
+    """
+    Create an empty F-curve, replacing any curve already on that channel
+    """
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is not None:
+        action.fcurves.remove(fcurve)
+    
+    return action.fcurves.new(data_path, index=index, action_group=group)
+
+def writeKeyframes(fcurve, frames, values, linear=False):
+    """
+    Fill an F-curve with all keyframes in one bulk call
+    --
+    frames and values are equal length sequences, sorted by frame. Decimated
+    curves must be linear, the error bound does not hold for bezier segments.
+    """
+    count = len(frames)
+    co = np.empty(2 * count, dtype=np.float32)
+    co[0::2] = frames
+    co[1::2] = values
+    
+    fcurve.keyframe_points.add(count)
+    fcurve.keyframe_points.foreach_set("co", co)
+    if linear:
+        fcurve.keyframe_points.foreach_set(
+            "interpolation", [LINEAR_INTERPOLATION] * count)
+    fcurve.update()
+
+def getDrivenProperties(channels):
+    """
+    Group joint channels by the vector property they drive
+    --
+    returns dict of (object name, data path):list of JointChannel
+    """
+    driven = {}
+    for channel in channels.values():
+        driven.setdefault((channel.obj.name, channel.data_path), []).append(channel)
+    
+    return driven
+
+def zeroDrivenProperties(channels):
+    """
+    Set every property driven by a joint channel to its zero'd position
+    """
+    for driven in getDrivenProperties(channels).values():
+        owner, prop = driven[0].owner, driven[0].prop
+        setattr(owner, prop, [0.0] * len(getattr(owner, prop)))
+
+def writeJointCurves(channels, joints, curves, linear=False):
+    """
+    Write a whole trajectory into the F-curves of the joint channels
+    --
+    curves is a list of (time array, value array) per joint
+    """
+    # Components of a driven property without a column are zero'd at frame -1
+    for driven in getDrivenProperties(channels).values():
+        channel = driven[0]
+        action = getAction(channel.obj)
+        used = {c.index for c in driven}
+        for index in range(len(getattr(channel.owner, channel.prop))):
+            if index not in used:
+                fcurve = newFCurve(action, channel.data_path, index,
+                                   channel.obj.name)
+                writeKeyframes(fcurve, [-1.0], [0.0])
+    
+    for col, (times, joint_values) in zip(joints, curves):
+        channel = channels[col]
+        action = getAction(channel.obj)
+        
+        # Keep sub-frame timing instead of truncating, so no samples collide
+        frames = np.concatenate(([-1.0], times * FRAMES_PER_SECOND))
+        
+        fcurve = newFCurve(action, channel.data_path, channel.index,
+                           channel.obj.name)
+        # Zero'd position is saved at frame -1, as in keyframe mode
+        writeKeyframes(fcurve, frames,
+                       np.concatenate(([0.0], channel.sign * joint_values)), linear)
+        
+        lprint("Wrote keyframes for joint: " + col)
+    
+    zeroDrivenProperties(channels)
+
+def decimateJoint(times, values, tolerance):
+    """
+    Ramer-Douglas-Peucker simplification of a single joint trajectory
+    --
+    The error of a dropped sample is its distance to the linear interpolation
+    of the kept neighbours at the sample's time. First and last sample are
+    always kept.
+    returns boolean mask of the samples to keep
+    """
+    count = len(values)
+    keep = np.zeros(count, dtype=bool)
+    keep[[0, -1]] = True
+    
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        
+        duration = times[last] - times[first]
+        slope = (values[last] - values[first]) / duration if duration > 0 else 0.0
+        error = np.abs(values[first + 1:last] - values[first]
+                       - slope * (times[first + 1:last] - times[first]))
+        
+        worst = int(np.argmax(error))
+        if error[worst] > tolerance:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    
+    return keep
+
+def decimateTrajectory(times, values, tolerance):
+    """
+    Simplify every joint of a trajectory within tolerance
+    --
+    returns (list of (time array, value array) per joint, max error per joint)
+    """
+    curves = []
+    errors = []
+    for rot_values in values:
+        keep = decimateJoint(times, rot_values, tolerance)
+        kept_times, kept_values = times[keep], rot_values[keep]
+        
+        errors.append(float(np.max(np.abs(
+            np.interp(times, kept_times, kept_values) - rot_values))))
+        curves.append((kept_times, kept_values))
+    
+    return curves, errors
+
+def reportDecimation(joints, samples, curves, errors):
+    """
+    Print compression ratio and max error of each decimated joint
+    """
+    for col, (times, _), error in zip(joints, curves, errors):
+        lprint("Decimated joint " + col + ": " + str(samples) + " -> "
+               + str(len(times)) + " keyframes ("
+               + "{:.1f}".format(samples / len(times)) + "x), max error "
+               + "{:.6f}".format(error))
+
+def interpolateJoints(times, values, frame_times, method=RESAMPLE):
+    """
+    Interpolate all joints of a trajectory at the given times
+    --
+    "LINEAR" interpolates each joint angle linearly, which for a joint
+    rotating around a single axis is the same as slerp. "CUBIC" uses hermite
+    splines with tangents from central differences of the samples.
+    returns joints x frame_times array
+    """
+    # Repeated timestamps would give zero length segments
+    unique = np.diff(times, prepend=-np.inf) > 0
+    times, values = times[unique], values[:, unique]
+    
+    if method == "LINEAR" or len(times) < 3:
+        return np.stack([np.interp(frame_times, times, v) for v in values])
+    
+    tangents = np.gradient(values, times, axis=1)
+    seg = np.clip(np.searchsorted(times, frame_times, side='right') - 1,
+                  0, len(times) - 2)
+    
+    length = times[seg + 1] - times[seg]
+    s = np.clip((frame_times - times[seg]) / length, 0.0, 1.0)
+    s2 = s * s
+    s3 = s2 * s
+    
+    return ((2 * s3 - 3 * s2 + 1) * values[:, seg]
+            + (s3 - 2 * s2 + s) * length * tangents[:, seg]
+            + (-2 * s3 + 3 * s2) * values[:, seg + 1]
+            + (s3 - s2) * length * tangents[:, seg + 1])
+
+def resampleTrajectory(times, values, method=RESAMPLE):
+    """
+    Resample a trajectory onto the render frame grid
+    --
+    returns (frame time array, joints x frames array)
+    """
+    frames = np.arange(ceil(times[0] * FRAMES_PER_SECOND),
+                       floor(times[-1] * FRAMES_PER_SECOND) + 1)
+    frame_times = frames / FRAMES_PER_SECOND
+    
+    return frame_times, interpolateJoints(times, values, frame_times, method)
+
+def resampleChunk(times, values, carry, next_frame, final=False,
+                  method=RESAMPLE):
+    """
+    Resample one chunk of a streamed trajectory onto the render frame grid
+    --
+    carry holds the last three samples of the previous chunk, which is
+    enough context for the cubic tangents. Frames past the second to last
+    sample are left to the next chunk unless this is the final call.
+    returns (frame times, joints x frames array, carry, next frame)
+    """
+    if carry is not None:
+        times = np.concatenate((carry[0], times))
+        values = np.concatenate((carry[1], values), axis=1)
+    
+    empty = (np.empty(0), np.empty((len(values), 0)))
+    if len(times) < 2:
+        return empty + ((times, values), next_frame)
+    
+    if next_frame is None:
+        next_frame = ceil(times[0] * FRAMES_PER_SECOND)
+    end = times[-1] if final else times[-2]
+    last_frame = floor(end * FRAMES_PER_SECOND)
+    if not final and last_frame / FRAMES_PER_SECOND >= end:
+        last_frame -= 1
+    
+    carry = (times[-3:], values[:, -3:])
+    if last_frame < next_frame:
+        return empty + (carry, next_frame)
+    
+    frame_times = np.arange(next_frame, last_frame + 1) / FRAMES_PER_SECOND
+    return (frame_times, interpolateJoints(times, values, frame_times, method),
+            carry, last_frame + 1)
+
+def getJointLimits(channel):
+    """
+    Get the position and velocity limits of a joint channel
+    --
+    Single DOF position limits come from "joint/limits/lower" and
+    "joint/limits/upper" properties, otherwise from a limit rotation or limit
+    location constraint on the channel's object or bone.
+    returns (lower, upper, max velocity), infinite where not defined
+    """
+    obj = channel.obj
+    lower, upper = -np.inf, np.inf
+    single_dof = obj.get("joint/type", "revolute") in ("revolute", "continuous", "prismatic")
+    if single_dof and "joint/limits/lower" in obj and "joint/limits/upper" in obj:
+        lower, upper = obj["joint/limits/lower"], obj["joint/limits/upper"]
+    else:
+        name = "xyz"[channel.index]
+        ctype, use = (('LIMIT_ROTATION', ("use_limit_" + name,) * 2)
+                      if channel.prop == "rotation_euler" else
+                      ('LIMIT_LOCATION', ("use_min_" + name, "use_max_" + name)))
+        for constraint in channel.owner.constraints:
+            if constraint.type == ctype:
+                if getattr(constraint, use[0]):
+                    lower = getattr(constraint, "min_" + name)
+                if getattr(constraint, use[1]):
+                    upper = getattr(constraint, "max_" + name)
+                break
+        if channel.sign < 0:
+            # Constraints limit the driven property, the csv holds joint values
+            lower, upper = -upper, -lower
+    
+    velocity = np.inf
+    for prop in VELOCITY_PROPERTIES:
+        # Phobos writes 0 for joints without a velocity limit
+        if obj.get(prop):
+            velocity = obj[prop]
+            break
+    
+    return lower, upper, velocity
+
+def findIntervals(mask, times):
+    """
+    Get the (start time, end time) of every run of True in a samples mask
+    """
+    edges = np.flatnonzero(np.diff(mask.astype(np.int8), prepend=0, append=0))
+    
+    return list(zip(times[edges[0::2]].tolist(), times[edges[1::2] - 1].tolist()))
+
+def checkJointLimits(joints, times, values, limits):
+    """
+    Scan all joints over all samples for limit violations in one pass
+    --
+    limits is a joints x 3 array of (lower, upper, max velocity). Velocities
+    are finite differences, so a velocity violation interval spans the
+    samples on both sides of each offending step.
+    returns dict of joint name:report for the joints that violate limits,
+    and (max abs velocity, max abs acceleration) per joint
+    """
+    lower, upper, max_velocity = (limits.T[:, :, None]).astype(np.float64)
+    
+    step = np.diff(times)
+    valid = step > 0
+    dt = np.where(valid, step, 1.0)
+    velocity = np.where(valid, np.diff(values, axis=1) / dt, 0.0)
+    acceleration = np.diff(velocity, axis=1) / ((dt[1:] + dt[:-1]) / 2)
+    
+    below = values < lower
+    above = values > upper
+    speeding = np.abs(velocity) > max_velocity
+    
+    reports = {}
+    for j in np.flatnonzero(below.any(axis=1) | above.any(axis=1)
+                            | speeding.any(axis=1)):
+        over = speeding[j]
+        reports[joints[j]] = {
+            "position": findIntervals(below[j] | above[j], times),
+            "velocity": findIntervals(
+                np.concatenate(([False], over)) | np.concatenate((over, [False])),
+                times),
+            "overshoot": float(max(np.max(lower[j] - values[j]),
+                                   np.max(values[j] - upper[j]), 0.0)),
+        }
+    
+    peaks = (np.abs(velocity).max(axis=1, initial=0.0),
+             np.abs(acceleration).max(axis=1, initial=0.0))
+    return reports, peaks
+
+def mergeLimitReports(total, reports):
+    """
+    Merge the limit reports of a chunk into the reports of the whole file
+    --
+    Chunks share their boundary sample, so intervals touching it are joined.
+    """
+    for col, report in reports.items():
+        if col not in total:
+            total[col] = report
+            continue
+        for key in ("position", "velocity"):
+            intervals = total[col][key]
+            for start, end in report[key]:
+                if intervals and start <= intervals[-1][1]:
+                    intervals[-1] = (intervals[-1][0], end)
+                else:
+                    intervals.append((start, end))
+        total[col]["overshoot"] = max(total[col]["overshoot"], report["overshoot"])
+
+def reportJointLimits(joints, reports, peaks):
+    """
+    Print a compact per-joint summary of limit violations
+    """
+    for j, col in enumerate(joints):
+        summary = ("Joint " + col + ": max velocity " + "{:.3f}".format(peaks[0][j])
+                   + ", max acceleration " + "{:.3f}".format(peaks[1][j]))
+        if col not in reports:
+            lprint(summary)
+            continue
+        
+        report = reports[col]
+        for key in ("position", "velocity"):
+            intervals = report[key]
+            if intervals:
+                summary += (", " + str(len(intervals)) + " " + key
+                            + " violation(s) e.g. " + ", ".join(
+                                "{:.3f}-{:.3f}s".format(a, b) for a, b in intervals[:3]))
+        if report["overshoot"] > 0:
+            summary += ", worst " + "{:.4f}".format(report["overshoot"]) + " beyond limits"
+        lprint(summary, "WARNING")
+
+def scanJointLimits(channels, joints, times, values):
+    """
+    Check a whole trajectory against the limits of its joint objects
+    """
+    limits = np.array([getJointLimits(channels[col]) for col in joints],
+                      dtype=np.float64).reshape(-1, 3)
+    reports, peaks = checkJointLimits(joints, times, values, limits)
+    reportJointLimits(joints, reports, peaks)
+    
+    return reports
+
+def reduceTrajectory(joints, times, values):
+    """
+    Run a whole trajectory through resampling and decimation
+    --
+    returns (list of (time array, value array) per joint, whether the curves
+    need linear interpolation)
+    """
+    if RESAMPLE is not None:
+        times, values = resampleTrajectory(times, values)
+        lprint("Resampled to " + str(len(times)) + " frames")
+    
+    linear = RESAMPLE is not None or DECIMATE_TOLERANCE is not None
+    if DECIMATE_TOLERANCE is None:
+        return [(times, v) for v in values], linear
+    
+    curves, errors = decimateTrajectory(times, values, DECIMATE_TOLERANCE)
+    reportDecimation(joints, len(times), curves, errors)
+    
+    return curves, linear
+
+def bulkReadCSVAnimationFile(fp):
+    """
+    Read csv animation and write it straight into per-axis F-curves
+    --
+    Unlike readCSVAnimationFile this never touches the scene per sample, so
+    the cost of keyframe creation is a handful of array copies per joint.
+    """
+    
+    lprint("Reading file at path: " + fp)
+    
+    joints, times, values = loadTrajectory(fp)
+    channels = compileJointMap(getJointsFromHeaders(joints), joints)
+    
+    lprint("File read successfully, writing " + str(len(times))
+           + " samples for " + str(len(joints)) + " joints")
+    
+    if CHECK_LIMITS:
+        scanJointLimits(channels, joints, times, values)
+    
+    curves, linear = reduceTrajectory(joints, times, values)
+    writeJointCurves(channels, joints, curves, linear)
+    
+    lprint("Done loading csv animation.")
+
+def iterCSVChunks(fp, chunk_size=CHUNK_SIZE):
+    """
+    Read a csv animation file in chunks of at most chunk_size rows
+    --
+    yields (joint headers, time array, joints x samples float32 array)
+    """
+    with open(fp) as csvfile:
+        headers = next(csv.reader([csvfile.readline()]))
+        time_col = headers.index("time")
+        joint_cols = [i for i, col in enumerate(headers) if col != "time"]
+        joints = [headers[i] for i in joint_cols]
+        
+        while True:
+            lines = list(itertools.islice(csvfile, chunk_size))
+            if not lines:
+                break
+            # Blank lines, e.g. at the end of the file, hold no samples
+            lines = [line for line in lines if line.strip()]
+            if not lines:
+                continue
+            
+            data = parseCSVLines(lines).reshape(-1, len(headers)).T
+            yield (joints, data[time_col],
+                   np.ascontiguousarray(data[joint_cols], dtype=np.float32))
+
+def thinToFrames(times, values, last_frame):
+    """
+    Keep only the first sample inside each render frame
+    --
+    Kept samples retain their exact time. last_frame is the frame of the last
+    sample read in the previous chunk, so thinning is seamless across chunks.
+    returns (times, values, last frame)
+    """
+    frame_ids = np.floor(times * FRAMES_PER_SECOND)
+    keep = np.diff(frame_ids, prepend=last_frame) != 0
+    
+    return times[keep], values[:, keep], frame_ids[-1]
+
+def decimateChunk(times, values, carry, tolerance):
+    """
+    Decimate one chunk of a streamed trajectory
+    --
+    carry is the (time, joint values) of the last sample of the previous
+    chunk. It is always kept, so joining it to this chunk keeps the error
+    bound across chunk boundaries.
+    returns (curves, max error per joint, carry for the next chunk)
+    """
+    if carry is not None:
+        times = np.concatenate(([carry[0]], times))
+        values = np.concatenate((carry[1][:, None], values), axis=1)
+    
+    curves, errors = decimateTrajectory(times, values, tolerance)
+    if carry is not None:
+        # The carried sample was already stored with the previous chunk
+        curves = [(t[1:], v[1:]) for t, v in curves]
+    
+    return curves, errors, (times[-1], values[:, -1])
+
+def reduceChunk(state, times, values, final=False):
+    """
+    Run one chunk of a streamed trajectory through resampling and decimation
+    --
+    state carries whatever each stage needs from the previous chunk.
+    returns list of (time array, value array) per joint
+    """
+    if RESAMPLE is not None:
+        times, values, state["resample_carry"], state["next_frame"] = \
+            resampleChunk(times, values, state.get("resample_carry"),
+                          state.get("next_frame"), final)
+    elif DECIMATE_TOLERANCE is None:
+        times, values, state["last_frame"] = thinToFrames(
+            times, values, state.get("last_frame", -np.inf))
+    
+    if DECIMATE_TOLERANCE is None or not len(times):
+        return [(times, v) for v in values]
+    
+    curves, errors, state["decimate_carry"] = decimateChunk(
+        times, values, state.get("decimate_carry"), DECIMATE_TOLERANCE)
+    state["samples"] = state.get("samples", 0) + len(times)
+    state["errors"] = [max(a, b) for a, b in
+                       zip(state.get("errors", errors), errors)]
+    
+    return curves
+
+def streamReadCSVAnimationFile(fp, chunk_size=CHUNK_SIZE):
+    """
+    Read csv animation chunk by chunk and write the reduced keyframes
+    --
+    Only the current chunk and the already reduced samples are held in
+    memory, so peak memory does not grow with the raw log length.
+    """
+    
+    lprint("Streaming file at path: " + fp)
+    
+    channels = None
+    joints = None
+    kept = None
+    state = {}
+    rows = 0
+    
+    def keep(curves):
+        for (kept_times, kept_values), (t, v) in zip(kept, curves):
+            kept_times.append(t)
+            kept_values.append(v)
+    
+    for i, (joints, times, values) in enumerate(iterCSVChunks(fp, chunk_size)):
+        if channels is None:
+            channels = compileJointMap(getJointsFromHeaders(joints), joints)
+            kept = [([], []) for _ in joints]
+            limits = np.array([getJointLimits(channels[col]) for col in joints],
+                              dtype=np.float64)
+            reports = {}
+            peaks = np.zeros((2, len(joints)))
+        
+        if CHECK_LIMITS:
+            # Prepend the previous chunk's last sample for the differences
+            check_times, check_values = times, values
+            if "limits_carry" in state:
+                check_times = np.concatenate(([state["limits_carry"][0]], times))
+                check_values = np.concatenate(
+                    (state["limits_carry"][1][:, None], values), axis=1)
+            chunk_reports, chunk_peaks = checkJointLimits(
+                joints, check_times, check_values, limits)
+            mergeLimitReports(reports, chunk_reports)
+            peaks = np.maximum(peaks, chunk_peaks)
+            state["limits_carry"] = (times[-1], values[:, -1])
+        
+        rows += len(times)
+        keep(reduceChunk(state, times, values))
+        
+        lprint("Chunk " + str(i) + ": read " + str(rows) + " rows, kept "
+               + str(sum(len(t) for kept_times, _ in kept for t in kept_times))
+               + " keyframes")
+    
+    if channels is None:
+        lprint("No samples found in file", "WARNING")
+        return
+    
+    if CHECK_LIMITS:
+        reportJointLimits(joints, reports, peaks)
+    
+    if RESAMPLE is not None:
+        # Flush the frames held back for the last samples' context
+        keep(reduceChunk(state, np.empty(0), np.empty((len(joints), 0)),
+                         final=True))
+    
+    curves = [(np.concatenate(t), np.concatenate(v)) for t, v in kept]
+    if "errors" in state:
+        reportDecimation(joints, state["samples"], curves, state["errors"])
+    writeJointCurves(channels, joints, curves,
+                     RESAMPLE is not None or DECIMATE_TOLERANCE is not None)
+    
+    lprint("Done loading csv animation.")
+
+def getFrameRows(times, last_frame):
+    """
+    Get the trajectory row shown at each frame from 0 to last_frame
+    --
+    Each frame shows the last sample at or before its time.
+    """
+    frame_times = np.arange(last_frame + 1) / FRAMES_PER_SECOND
+    rows = np.searchsorted(times, frame_times, side='right') - 1
+    
+    return np.clip(rows, 0, len(times) - 1)
+
+def liveFrameChangeHandler(scene, *args):
+    """
+    Pose the joints from the trajectory row of the current frame
+    --
+    Registered to frame_change_pre, so it runs for viewport playback as well
+    as for (background) rendering.
+    """
+    if not LIVE_STATE:
+        return
+    
+    frame = scene.frame_current_final
+    rows = LIVE_STATE["rows"]
+    if frame < 0:
+        # Zero'd position before the animation, as at frame -1 in keyframe mode
+        row = None
+    elif frame.is_integer() and frame < len(rows):
+        row = rows[int(frame)]
+    else:
+        row = np.searchsorted(LIVE_STATE["times"], frame / FRAMES_PER_SECOND,
+                              side='right') - 1
+        row = min(max(row, 0), len(LIVE_STATE["times"]) - 1)
+    
+    for channel, joint_values in zip(LIVE_STATE["channels"], LIVE_STATE["values"]):
+        getattr(channel.owner, channel.prop)[channel.index] = (
+            0.0 if row is None else channel.sign * float(joint_values[row]))
+
+def liveReadCSVAnimationFile(fp):
+    """
+    Play csv animation back through a frame change handler, without keyframes
+    --
+    The trajectory is memory-mapped from the cache, so import is instant and
+    nothing but the joints' current pose ends up in the .blend file.
+    """
+    
+    lprint("Reading file at path: " + fp)
+    
+    joints, times, values = mapTrajectory(fp)
+    channels = compileJointMap(getJointsFromHeaders(joints), joints)
+    
+    if CHECK_LIMITS:
+        scanJointLimits(channels, joints, times, values)
+    
+    # Existing F-curves of the driven properties would override the handler
+    for obj_name, data_path in getDrivenProperties(channels):
+        obj = bpy.data.objects[obj_name]
+        if obj.animation_data and obj.animation_data.action:
+            fcurves = obj.animation_data.action.fcurves
+            for fcurve in [fc for fc in fcurves if fc.data_path == data_path]:
+                fcurves.remove(fcurve)
+    zeroDrivenProperties(channels)
+    
+    LIVE_STATE.clear()
+    LIVE_STATE.update({
+        "channels": [channels[col] for col in joints],
+        "times": times,
+        "values": values,
+        "rows": getFrameRows(times, ceil(times[-1] * FRAMES_PER_SECOND)),
+    })
+    
+    # Replace the handler of a previous run of this script
+    handlers = bpy.app.handlers.frame_change_pre
+    for handler in [h for h in handlers
+                    if h.__name__ == liveFrameChangeHandler.__name__]:
+        handlers.remove(handler)
+    handlers.append(liveFrameChangeHandler)
+    
+    scene = bpy.context.scene
+    # Keep the UI from reading joint poses while a render changes them
+    scene.render.use_lock_interface = True
+    liveFrameChangeHandler(scene)
+    
+    lprint("Live playback of " + str(len(times)) + " samples for "
+           + str(len(joints)) + " joints registered.")
+
+def buildJointIndex(scene):
+    """
+    Index all objects of a scene by name, once per robot root
+    --
+    returns dict of root name:{object name:object}, with the key None
+    holding every object in the scene
+    """
+    roots = {}
+    index = {None: {}}
+    for obj in scene.objects:
+        # Walk up until we hit the root or an object whose root we know
+        chain = []
+        root = obj
+        while root.name not in roots and root.parent is not None:
+            chain.append(root)
+            root = root.parent
+        root = roots.get(root.name, root)
+        for link in chain:
+            roots[link.name] = root
+        roots[obj.name] = root
+        
+        index[None][obj.name] = obj
+        index.setdefault(root.name, {})[obj.name] = obj
+    
+    return index
+
+def getJointsFromIndex(index, entry, joints):
+    """
+    Get the joint objects of a manifest entry from the scene index
+    --
+    raises KeyError naming the root or joint objects that are missing
+    returns dict of name:object (in scene)
+    """
+    root = entry.get("root")
+    if root not in index:
+        if root in index[None]:
+            raise KeyError("Object " + root + " is not the root of a robot")
+        raise KeyError("Root object " + root + " not found in scene")
+    objects = index[root]
+    prefix = entry.get("prefix", "")
+    
+    names = {name: prefix + name.partition(":")[0] for name in joints}
+    missing = sorted(set(names.values()) - objects.keys())
+    if missing:
+        raise KeyError("Joint objects not found under "
+                       + (root or "scene") + ": " + ", ".join(missing))
+    
+    return {name: objects[objname] for name, objname in names.items()}
+
+def batchReadCSVAnimationFiles(manifest):
+    """
+    Import the trajectories of several robots in one pass
+    --
+    Files are parsed concurrently in a thread pool, while the trajectories
+    that are already parsed get written to Blender on the main thread.
+    Entries that share a csv file share its parsed trajectory, so no two
+    threads write the same cache. Entries whose objects are missing are
+    reported and skipped.
+    IMPORT_MODE is ignored, every trajectory is written like in "BULK" mode:
+    the pool parses whole files, which "STREAM" avoids, "LIVE" plays back a
+    single trajectory and "KEYFRAME" is what the batch import replaces.
+    """
+    
+    lprint("Importing " + str(len(manifest)) + " animation files")
+    
+    index = buildJointIndex(bpy.context.scene)
+    
+    with ThreadPoolExecutor() as pool:
+        futures = {}
+        for entry in manifest:
+            fp = os.path.realpath(entry["file"])
+            if fp not in futures:
+                futures[fp] = pool.submit(loadTrajectory, fp)
+        
+        for entry in manifest:
+            joints, times, values = futures[os.path.realpath(entry["file"])].result()
+            try:
+                objs = getJointsFromIndex(index, entry, joints)
+            except KeyError as e:
+                lprint("Skipping " + entry["file"] + ": " + e.args[0], "ERROR")
+                continue
+            channels = compileJointMap(objs, joints, entry.get("axes", AXES))
+            
+            lprint("Writing " + str(len(times)) + " samples for "
+                   + str(len(joints)) + " joints from: " + entry["file"])
+            
+            if CHECK_LIMITS:
+                scanJointLimits(channels, joints, times, values)
+            
+            curves, linear = reduceTrajectory(joints, times, values)
+            writeJointCurves(channels, joints, curves, linear)
+    
+    lprint("Done loading csv animations.")
+
 if __name__ == "__main__":
-    readCSVAnimationFile(MOTION_FILE_PATH)
\ No newline at end of file
+    if MANIFEST is not None:
+        batchReadCSVAnimationFiles(MANIFEST)
+    elif IMPORT_MODE == "BULK":
+        bulkReadCSVAnimationFile(MOTION_FILE_PATH)
+    elif IMPORT_MODE == "STREAM":
+        streamReadCSVAnimationFile(MOTION_FILE_PATH)
+    elif IMPORT_MODE == "LIVE":
+        liveReadCSVAnimationFile(MOTION_FILE_PATH)
+    else:
+        readCSVAnimationFile(MOTION_FILE_PATH)
\ No newline at end of file
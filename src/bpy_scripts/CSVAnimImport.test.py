@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+
+# Run with: blender -b --python src/bpy_scripts/CSVAnimImport.test.py
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import CSVAnimImport
+
+
+class TestCSVChunks(unittest.TestCase):
+
+    def setUp(self):
+        csvfile = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        csvfile.write('time,elbow,wrist\n0.0,1.0,2.0\n0.1,1.5,2.5\n0.2,2.0,3.0\n\n\n\n')
+        csvfile.close()
+        self.fp = csvfile.name
+
+    def tearDown(self):
+        os.remove(self.fp)
+
+    def test_iterCSVChunks_trailingBlankLines(self):
+        # the blank lines at the end fill chunks of their own
+        chunks = list(CSVAnimImport.iterCSVChunks(self.fp, chunk_size=2))
+        self.assertEqual(len(chunks), 2)
+        for joints, times, values in chunks:
+            self.assertListEqual(joints, ['elbow', 'wrist'])
+            self.assertGreater(times.size, 0)
+            self.assertEqual(values.shape, (2, times.size))
+        self.assertListEqual(
+            [float(time) for _, times, _ in chunks for time in times], [0.0, 0.1, 0.2])
+
+
+class TestJointAxis(unittest.TestCase):
+
+    def test_getJointAxis(self):
+        # custom properties are read like from a dict
+        self.assertTupleEqual(
+            CSVAnimImport.getJointAxis({'joint/axis': (0., 0., -1.)}, 'elbow', {}), (2, -1.0))
+        self.assertTupleEqual(
+            CSVAnimImport.getJointAxis({'joint/axis': (0., 1., 0.)}, 'elbow', {}), (1, 1.0))
+        self.assertTupleEqual(
+            CSVAnimImport.getJointAxis({'joint/axis': 'x'}, 'elbow', {}), (0, 1.0))
+        # AXES overrides the joint axis
+        self.assertTupleEqual(CSVAnimImport.getJointAxis(
+            {'joint/axis': (0., 0., 1.)}, 'elbow', {'elbow': '-Y'}), (1, -1.0))
+        with self.assertRaises(KeyError):
+            CSVAnimImport.getJointAxis({}, 'elbow', {})
+
+
+
+class TestTrajectoryCache(unittest.TestCase):
+
+    def setUp(self):
+        csvfile = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        csvfile.write('time,elbow,wrist\n0.0,1.0,2.0\n0.1,1.5,2.5\n')
+        csvfile.close()
+        self.fp = csvfile.name
+
+    def tearDown(self):
+        os.remove(self.fp)
+        shutil.rmtree(CSVAnimImport.getCacheDir(self.fp), ignore_errors=True)
+
+    def test_mapTrajectory(self):
+        # the cache is mapped on the first run as well
+        for _ in range(2):
+            joints, times, values = CSVAnimImport.mapTrajectory(self.fp)
+            self.assertListEqual(joints, ['elbow', 'wrist'])
+            self.assertIsInstance(times, CSVAnimImport.np.memmap)
+            self.assertIsInstance(values, CSVAnimImport.np.memmap)
+            self.assertListEqual(values.tolist(), [[1.0, 1.5], [2.0, 2.5]])
+
+
+
+class TestJointIndex(unittest.TestCase):
+
+    def setUp(self):
+        # objects only have to be told apart
+        self.index = {
+            None: {'robot': 'robot', 'r_elbow': 'r_elbow', 'other': 'other'},
+            'robot': {'robot': 'robot', 'r_elbow': 'r_elbow'},
+            'other': {'other': 'other'},
+        }
+
+    def test_getJointsFromIndex(self):
+        entry = {'file': 'robot.csv', 'root': 'robot', 'prefix': 'r_'}
+        self.assertDictEqual(
+            CSVAnimImport.getJointsFromIndex(self.index, entry, ['elbow', 'elbow:x']),
+            {'elbow': 'r_elbow', 'elbow:x': 'r_elbow'})
+
+    def test_getJointsFromIndex_missing(self):
+        for entry in ({'file': 'robot.csv', 'root': 'missing'},
+                      {'file': 'robot.csv', 'root': 'r_elbow'},
+                      {'file': 'robot.csv', 'root': 'other'}):
+            with self.assertRaises(KeyError):
+                CSVAnimImport.getJointsFromIndex(self.index, entry, ['r_elbow'])
+
+
+if __name__ == '__main__':
+    # Blender's own command line arguments must not be parsed as test names
+    unittest.main(argv=[sys.argv[0]])